@@ -1,172 +1,232 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
-import math
-import cv2
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import numpy as np
-import mediapipe as mp
-
-
-@dataclass
-class RawMetrics:
-    frames_total: int
-    frames_used: int
-    pose_frames: int
-    avg_torso_lean_deg: Optional[float]
-    overstride_ratio: Optional[float]
-    knee_drive_ratio: Optional[float]
-    vertical_oscillation_norm: Optional[float]
-    cadence_spm_est: Optional[float]
-
-
-def _angle_from_vertical(p1, p2) -> float:
-    dx = p1[0] - p2[0]
-    dy = p1[1] - p2[1]
-    return math.degrees(math.atan2(dx, -dy))
-
-
-def analyze_running_video(video_path: str, sample_every_n: int = 2) -> Dict[str, Any]:
-    mp_pose = mp.solutions.pose
-
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise RuntimeError(f"Could not open video: {video_path}")
-
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    frame_idx = 0
-    frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
-
-    torso_leans = []
-    hip_y_series = []
-    left_ankle_y = []
-    right_ankle_y = []
-    overstride_events = []
-    knee_drive_vals = []
-
-    pose_frames = 0
-    frames_used = 0
-
-    with mp_pose.Pose(
-        static_image_mode=False,
-        model_complexity=1,
-        enable_segmentation=False,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-    ) as pose:
-        while True:
-            ok, frame = cap.read()
-            if not ok:
-                break
-
-            frame_idx += 1
-            if frame_idx % sample_every_n != 0:
-                continue
 
-            frames_used += 1
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+from .config import CV_ROI_ENABLED, CV_SEGMENT_MIN_SEC, CV_SEGMENT_OVERLAP_SEC
+# RawMetrics is re-exported: it used to live here and is still importable from this module
+from .metrics import RawMetrics, compute_metrics  # noqa: F401
+from .frames import open_frame_source, probe_video
+from .pose import create_pose, reset_pose
+from .roi import RoiTracker
+from .timeline import LandmarkTimeline, NUM_LANDMARKS, LANDMARK_FIELDS
+
+
+# progress(frames_done, frames_total, partial) where partial() builds the timeline so far
+# (None when not available, e.g. segment-parallel runs). Building it copies, so call it sparingly.
+ProgressFn = Callable[[int, int, Callable[[], Optional[LandmarkTimeline]]], None]
+
+
+def _no_partial() -> Optional[LandmarkTimeline]:
+    return None
+
+
+def _infer_range(
+    video_path: str,
+    sample_every_n: int,
+    model_complexity: int,
+    pose=None,
+    start_frame: int = 0,
+    keep_from: int = 0,
+    end_frame: Optional[int] = None,
+    info: Optional[Dict[str, Any]] = None,
+    progress: Optional[ProgressFn] = None,
+    roi: bool = CV_ROI_ENABLED,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Decode frames [start_frame, end_frame) via the configured frame source and run pose
+    on the sampled ones.
+    Frames before `keep_from` only warm up tracking and are dropped from the output.
+    Sampling uses absolute frame numbers so segments line up with a serial run.
+    `roi` False runs pose on the whole (resolution-capped) frame.
+    `progress` (see ProgressFn) is called after each sampled frame; callers throttle.
+    Returns (frame_indices, landmarks, frames_decoded_up_to).
+    """
+    if pose is not None:
+        reset_pose(pose)
+
+    frame_indices = []
+    landmarks = []
+    tracker: Optional[RoiTracker] = None
+
+    source = open_frame_source(
+        video_path,
+        sample_every_n=sample_every_n,
+        start_frame=start_frame,
+        end_frame=end_frame,
+        info=info,
+    )
+    with source, (nullcontext(pose) if pose is not None else create_pose(model_complexity)) as pose:
+        for frame_idx, frame in source:
+            frame_h, frame_w = frame.shape[:2]
+            if tracker is None:
+                tracker = RoiTracker(frame_w, frame_h, enabled=roi)
+
+            rgb, box = tracker.prepare(frame)
             res = pose.process(rgb)
-            if not res.pose_landmarks:
-                continue
 
-            pose_frames += 1
-            lm = res.pose_landmarks.landmark
-
-            def pt(i):
-                return (lm[i].x, lm[i].y, lm[i].visibility)
-
-            L_SHOULDER, R_SHOULDER = 11, 12
-            L_HIP, R_HIP = 23, 24
-            L_KNEE, R_KNEE = 25, 26
-            L_ANKLE, R_ANKLE = 27, 28
-
-            left_vis = min(pt(L_SHOULDER)[2], pt(L_HIP)[2], pt(L_ANKLE)[2], pt(L_KNEE)[2])
-            right_vis = min(pt(R_SHOULDER)[2], pt(R_HIP)[2], pt(R_ANKLE)[2], pt(R_KNEE)[2])
-            use_left = left_vis >= right_vis
-
-            if use_left:
-                sh = pt(L_SHOULDER)
-                hip = pt(L_HIP)
-                knee = pt(L_KNEE)
-                ankle = pt(L_ANKLE)
-            else:
-                sh = pt(R_SHOULDER)
-                hip = pt(R_HIP)
-                knee = pt(R_KNEE)
-                ankle = pt(R_ANKLE)
-
-            torso_leans.append(abs(_angle_from_vertical((sh[0], sh[1]), (hip[0], hip[1]))))
-
-            hip_center_y = (pt(L_HIP)[1] + pt(R_HIP)[1]) / 2.0
-            hip_y_series.append(hip_center_y)
-
-            left_ankle_y.append(pt(L_ANKLE)[1])
-            right_ankle_y.append(pt(R_ANKLE)[1])
-
-            shoulder_center = (
-                (pt(L_SHOULDER)[0] + pt(R_SHOULDER)[0]) / 2.0,
-                (pt(L_SHOULDER)[1] + pt(R_SHOULDER)[1]) / 2.0,
-            )
-            hip_center = (
-                (pt(L_HIP)[0] + pt(R_HIP)[0]) / 2.0,
-                (pt(L_HIP)[1] + pt(R_HIP)[1]) / 2.0,
-            )
-            body_scale = max(0.05, math.dist(shoulder_center, hip_center))
-
-            ankle_ahead = abs(ankle[0] - hip[0]) / body_scale
-            overstride_events.append(ankle_ahead)
-
-            knee_drive = abs(hip[1] - knee[1]) / body_scale
-            knee_drive_vals.append(knee_drive)
-
-    cap.release()
-
-    if pose_frames < 10:
-        return {
-            "ok": False,
-            "error": "Pose detection confidence too low or too few valid frames",
-            "raw_metrics": RawMetrics(
-                frames_total=frames_total,
-                frames_used=frames_used,
-                pose_frames=pose_frames,
-                avg_torso_lean_deg=None,
-                overstride_ratio=None,
-                knee_drive_ratio=None,
-                vertical_oscillation_norm=None,
-                cadence_spm_est=None,
-            ).__dict__,
-        }
-
-    avg_torso_lean_deg = float(np.median(torso_leans)) if torso_leans else None
-    overstride_ratio = float(np.median(overstride_events)) if overstride_events else None
-    knee_drive_ratio = float(np.median(knee_drive_vals)) if knee_drive_vals else None
-    vertical_oscillation_norm = float(np.std(hip_y_series)) if len(hip_y_series) > 5 else None
-
-    cadence_spm_est = None
-    try:
-        series = np.array(left_ankle_y if len(left_ankle_y) >= len(right_ankle_y) else right_ankle_y, dtype=float)
-        if len(series) > 20:
-            series = series - np.mean(series)
-            peaks = 0
-            for i in range(1, len(series) - 1):
-                if series[i] > series[i - 1] and series[i] > series[i + 1]:
-                    peaks += 1
-            duration_sec = max(1e-6, (frames_used * sample_every_n) / fps)
-            cadence_spm_est = float((peaks / duration_sec) * 60.0)
-            cadence_spm_est = float(np.clip(cadence_spm_est, 120, 220))
-    except Exception:
-        cadence_spm_est = None
-
-    return {
-        "ok": True,
-        "raw_metrics": RawMetrics(
-            frames_total=frames_total,
-            frames_used=frames_used,
-            pose_frames=pose_frames,
-            avg_torso_lean_deg=avg_torso_lean_deg,
-            overstride_ratio=overstride_ratio,
-            knee_drive_ratio=knee_drive_ratio,
-            vertical_oscillation_norm=vertical_oscillation_norm,
-            cadence_spm_est=cadence_spm_est,
-        ).__dict__,
-    }
\ No newline at end of file
+            row = None
+            if res.pose_landmarks:
+                row = np.array(
+                    [(p.x, p.y, p.z, p.visibility) for p in res.pose_landmarks.landmark],
+                    dtype=np.float32,
+                )
+                tracker.to_full_frame(row, box, frame_w, frame_h)
+            if tracker.update(row):
+                reset_pose(pose)  # the crop moved: don't track/smooth across different inputs
+
+            if frame_idx < keep_from:
+                continue
+            if row is None:
+                row = np.full((NUM_LANDMARKS, LANDMARK_FIELDS), np.nan, dtype=np.float32)
+            frame_indices.append(frame_idx)
+            landmarks.append(row)
+            if progress is not None and info is not None:
+                progress(
+                    source.frames_read,
+                    info["frames_total"],
+                    lambda: _partial_timeline(info, sample_every_n, frame_indices, landmarks),
+                )
+
+    return (
+        np.asarray(frame_indices, dtype=np.int32),
+        (
+            np.stack(landmarks)
+            if landmarks
+            else np.empty((0, NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+        ),
+        source.frames_read,
+    )
+
+
+def _partial_timeline(
+    info: Dict[str, Any],
+    sample_every_n: int,
+    frame_indices: List[int],
+    landmarks: List[np.ndarray],
+) -> LandmarkTimeline:
+    return LandmarkTimeline(
+        fps=info["fps"],
+        frames_total=info["frames_total"],
+        frames_decoded=(frame_indices[-1] + 1) if frame_indices else 0,
+        width=info["width"],
+        height=info["height"],
+        sample_every_n=sample_every_n,
+        frame_indices=np.asarray(frame_indices, dtype=np.int32),
+        landmarks=np.stack(landmarks),
+    )
+
+
+def _segment_bounds(frames_total: int, segments: int, overlap_frames: int) -> List[Tuple[int, int, Optional[int]]]:
+    """(start_frame, keep_from, end_frame) per segment; the last segment reads to EOF."""
+    edges = np.linspace(0, frames_total, segments + 1).astype(int)
+    bounds = []
+    for i in range(segments):
+        keep_from = int(edges[i])
+        end = int(edges[i + 1]) if i < segments - 1 else None
+        bounds.append((max(0, keep_from - overlap_frames), keep_from, end))
+    return bounds
+
+
+def extract_landmark_timeline(
+    video_path: str,
+    sample_every_n: int = 2,
+    model_complexity: int = 1,
+    pose=None,
+    segment_workers: int = 1,
+    progress: Optional[ProgressFn] = None,
+    roi: bool = CV_ROI_ENABLED,
+) -> LandmarkTimeline:
+    """
+    Single decode + Pose pass: run pose on every `sample_every_n`-th frame and keep the landmarks.
+    Inference runs on a crop around the runner (unless `roi` is False), capped at
+    CV_MAX_INFER_SIDE (see cv.roi); landmarks are always stored in full-frame normalized coordinates.
+    Pass a warm `pose` (see cv.pose.create_pose) to reuse one graph across videos.
+
+    With segment_workers > 1, videos longer than CV_SEGMENT_MIN_SEC are split into time segments
+    that run in a process pool (each with its own Pose graph, `pose` is not used). Every segment
+    starts CV_SEGMENT_OVERLAP_SEC early so tracking is warm at its boundary, then the
+    per-segment timelines are stitched back together.
+    """
+    meta = probe_video(video_path)
+
+    fps = meta["fps"]
+    frames_total = meta["frames_total"]
+    use_segments = (
+        segment_workers > 1
+        and frames_total > 0
+        and frames_total / fps >= CV_SEGMENT_MIN_SEC
+    )
+
+    if not use_segments:
+        frame_indices, landmarks, frames_decoded = _infer_range(
+            video_path, sample_every_n, model_complexity, pose=pose, info=meta, progress=progress, roi=roi
+        )
+    else:
+        bounds = _segment_bounds(frames_total, segment_workers, int(round(CV_SEGMENT_OVERLAP_SEC * fps)))
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=segment_workers, mp_context=ctx) as ex:
+            futures = [
+                ex.submit(
+                    _infer_range,
+                    video_path,
+                    sample_every_n,
+                    model_complexity,
+                    None,
+                    start,
+                    keep_from,
+                    end,
+                    meta,
+                    None,
+                    roi,
+                )
+                for start, keep_from, end in bounds
+            ]
+            # Segments report progress only as they complete (no partial landmarks cross processes)
+            parts = []
+            done_frames = 0
+            for fut, (_start, keep_from, end) in zip(futures, bounds):
+                parts.append(fut.result())
+                done_frames += (end if end is not None else frames_total) - keep_from
+                if progress is not None:
+                    progress(done_frames, frames_total, _no_partial)
+
+        frame_indices = np.concatenate([p[0] for p in parts])
+        landmarks = np.concatenate([p[1] for p in parts])
+        frames_decoded = parts[-1][2]
+
+    return LandmarkTimeline(
+        fps=fps,
+        frames_total=frames_total,
+        frames_decoded=frames_decoded,
+        width=meta["width"],
+        height=meta["height"],
+        sample_every_n=sample_every_n,
+        frame_indices=frame_indices,
+        landmarks=landmarks,
+    )
+
+
+def analyze_timeline(timeline: LandmarkTimeline) -> Dict[str, Any]:
+    """Reduce a landmark timeline to running metrics (no video decoding or inference)."""
+    return compute_metrics(timeline)
+
+
+def analyze_running_video(
+    video_path: str,
+    sample_every_n: int = 2,
+    model_complexity: int = 1,
+    pose=None,
+    segment_workers: int = 1,
+) -> Dict[str, Any]:
+    timeline = extract_landmark_timeline(
+        video_path,
+        sample_every_n=sample_every_n,
+        model_complexity=model_complexity,
+        pose=pose,
+        segment_workers=segment_workers,
+    )
+    return analyze_timeline(timeline)
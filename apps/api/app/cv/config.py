@@ -0,0 +1,48 @@
+import os
+
+# Analysis settings. Anything that changes the output for the same video belongs in
+# analysis_config_key() so cached results are never reused across configurations.
+CV_SAMPLE_EVERY_N = int(os.getenv("CV_SAMPLE_EVERY_N", "2"))
+CV_MODEL_COMPLEXITY = int(os.getenv("CV_MODEL_COMPLEXITY", "1"))
+
+# Pose input: crop around the last detected runner (+ margin per side, as a fraction of the
+# body box) and cap the longest side fed to the model. 0 disables the cap.
+CV_ROI_ENABLED = os.getenv("CV_ROI_ENABLED", "1") == "1"
+CV_ROI_MARGIN = float(os.getenv("CV_ROI_MARGIN", "0.35"))
+CV_MAX_INFER_SIDE = int(os.getenv("CV_MAX_INFER_SIDE", "640"))
+
+# Video decoding for analysis: "opencv" (grab() skips unsampled frames) or "ffmpeg"
+# (rawvideo pipe; decimation + downscale to CV_DECODE_MAX_SIDE inside the decoder).
+CV_FRAME_SOURCE = os.getenv("CV_FRAME_SOURCE", "opencv").strip().lower()
+CV_DECODE_MAX_SIDE = int(os.getenv("CV_DECODE_MAX_SIDE", "1280"))
+
+# Browser-safe H.264 encode used for overlays (libx264). Threads 0 = let x264 decide.
+CV_OVERLAY_PRESET = os.getenv("CV_OVERLAY_PRESET", "veryfast")
+CV_OVERLAY_CRF = int(os.getenv("CV_OVERLAY_CRF", "23"))
+CV_OVERLAY_THREADS = int(os.getenv("CV_OVERLAY_THREADS", "0"))
+
+# Segment-parallel pose inference for long videos (1 = off). Doesn't change results
+# beyond tracking warm-up at segment edges, so it is not part of the cache key.
+CV_SEGMENT_WORKERS = int(os.getenv("CV_SEGMENT_WORKERS", "1"))
+CV_SEGMENT_MIN_SEC = float(os.getenv("CV_SEGMENT_MIN_SEC", "60"))
+CV_SEGMENT_OVERLAP_SEC = float(os.getenv("CV_SEGMENT_OVERLAP_SEC", "1.0"))
+
+# Live progress pushed to /results/{job_id}/events: frame counts at most every
+# CV_PROGRESS_INTERVAL_SEC, interim metrics on the partial timeline every CV_INTERIM_METRICS_SEC (0 = off).
+CV_PROGRESS_INTERVAL_SEC = float(os.getenv("CV_PROGRESS_INTERVAL_SEC", "0.5"))
+CV_INTERIM_METRICS_SEC = float(os.getenv("CV_INTERIM_METRICS_SEC", "2.0"))
+
+# Rubric new jobs are scored with (must be registered in cv.rubrics). Part of the cache key
+# because cached uploads reuse the stored scores.
+RUBRIC_VERSION = os.getenv("CV_RUBRIC_VERSION", "0.2.1-cv-overlay-ffmpeg")
+
+
+def analysis_config_key() -> str:
+    roi = f"roi{CV_ROI_MARGIN:g}-anchored" if CV_ROI_ENABLED else "full"
+    src = f"ffmpeg{CV_DECODE_MAX_SIDE}" if CV_FRAME_SOURCE == "ffmpeg" else "opencv"
+    return f"n{CV_SAMPLE_EVERY_N}-mc{CV_MODEL_COMPLEXITY}-{roi}-s{CV_MAX_INFER_SIDE}-{src}-{RUBRIC_VERSION}"
+
+
+def upload_content_key(sha256: str) -> str:
+    """Dedup key for an upload: content hash + the analysis configuration."""
+    return f"{sha256}:{analysis_config_key()}"
@@ -0,0 +1,152 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+from .config import CV_OVERLAY_CRF, CV_OVERLAY_PRESET, CV_OVERLAY_THREADS
+
+
+def ffmpeg_exe() -> str | None:
+    """
+    Return ffmpeg executable path if available, else None.
+    Works with PATH or common winget install locations.
+    """
+    # PATH first
+    ff = shutil.which("ffmpeg")
+    if ff:
+        return ff
+
+    # Common Windows fallback guesses (winget usually adds PATH, but just in case)
+    candidates = [
+        os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Links\ffmpeg.exe"),
+        os.path.expandvars(r"%ProgramFiles%\ffmpeg\bin\ffmpeg.exe"),
+        os.path.expandvars(r"%ProgramFiles%\Gyan\FFmpeg\bin\ffmpeg.exe"),
+    ]
+    for c in candidates:
+        if c and os.path.exists(c):
+            return c
+    return None
+
+
+def browser_h264_args(
+    preset: str = CV_OVERLAY_PRESET,
+    crf: int = CV_OVERLAY_CRF,
+    threads: int = CV_OVERLAY_THREADS,
+) -> list:
+    """libx264 + yuv420p + faststart: plays in every browser. Profile knobs come from cv.config."""
+    return [
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", str(crf),
+        "-threads", str(threads),
+        "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart",
+    ]
+
+
+def reencode_browser_safe_mp4(src_path: str, dst_path: str) -> None:
+    """
+    Re-encode video to browser-safe MP4 (H.264 + yuv420p + faststart) using ffmpeg.
+    Raises on failure.
+    """
+    ffmpeg = ffmpeg_exe()
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg not found")
+
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+
+    cmd = [
+        ffmpeg,
+        "-y",
+        "-i", src_path,
+        "-an",                     # drop audio for demo reliability (optional)
+        *browser_h264_args(),
+        dst_path,
+    ]
+
+    proc = subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg re-encode failed: {proc.stderr[-1000:]}")
+
+
+class FFmpegVideoWriter:
+    """
+    Streams raw BGR frames into a single ffmpeg/libx264 process over stdin,
+    producing the browser-safe MP4 directly (one encode, no intermediate file).
+    Output goes to a temp name in the destination folder and is renamed on close().
+    """
+
+    def __init__(self, dst_path: str, width: int, height: int, fps: float):
+        ffmpeg = ffmpeg_exe()
+        if not ffmpeg:
+            raise RuntimeError("ffmpeg not found")
+
+        dst_dir = os.path.dirname(dst_path) or "."
+        os.makedirs(dst_dir, exist_ok=True)
+        root, ext = os.path.splitext(os.path.basename(dst_path))
+        self.dst_path = dst_path
+        self.tmp_path = os.path.join(dst_dir, f".{root}.partial{ext}")
+        self.frame_shape = (height, width, 3)
+
+        self._stderr = tempfile.TemporaryFile()
+        cmd = [
+            ffmpeg,
+            "-y",
+            "-v", "error",
+            "-f", "rawvideo",
+            "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}",
+            "-r", f"{fps:.6f}",
+            "-i", "-",
+            "-an",
+            # yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            *browser_h264_args(),
+            "-f", "mp4",
+            self.tmp_path,
+        ]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def _error(self, what: str) -> RuntimeError:
+        self._stderr.seek(0)
+        tail = self._stderr.read()[-1000:].decode("utf-8", "replace")
+        return RuntimeError(f"ffmpeg {what}: {tail}")
+
+    def write(self, frame: np.ndarray) -> None:
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"frame shape {frame.shape} != writer shape {self.frame_shape}")
+        try:
+            self._proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+        except (BrokenPipeError, OSError):
+            self._proc.wait()
+            raise self._error("encoder exited early")
+
+    def close(self) -> None:
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        code = self._proc.wait()
+        try:
+            if code != 0:
+                raise self._error("encode failed")
+            os.replace(self.tmp_path, self.dst_path)
+        finally:
+            self._stderr.close()
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+    def abort(self) -> None:
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        self._stderr.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
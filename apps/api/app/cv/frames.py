@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import subprocess
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import CV_DECODE_MAX_SIDE, CV_FRAME_SOURCE
+from .ffmpeg import ffmpeg_exe
+
+
+def probe_video(video_path: str) -> Dict[str, Any]:
+    """fps / container frame count / frame size. Size comes from the first decoded frame, so it
+    matches what the frame sources actually yield (after any rotation metadata is applied)."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {video_path}")
+    try:
+        info = {
+            "fps": float(cap.get(cv2.CAP_PROP_FPS) or 30.0),
+            "frames_total": int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0),
+        }
+        ok, frame = cap.read()
+        if ok:
+            info["height"], info["width"] = frame.shape[:2]
+        return info
+    finally:
+        cap.release()
+
+
+def _is_sampled(frame_idx: int, sample_every_n: int) -> bool:
+    # 0-based frame index; keeps the historical "every n-th frame, starting at frame n" pattern
+    return (frame_idx + 1) % sample_every_n == 0
+
+
+class OpenCVFrameSource:
+    """
+    cv2.VideoCapture reader. Unsampled frames are only grab()bed, so they skip
+    the retrieve() step (pixel format conversion and copy out of the decoder).
+    """
+
+    name = "opencv"
+
+    def __init__(
+        self,
+        video_path: str,
+        sample_every_n: int = 1,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+    ):
+        self.video_path = video_path
+        self.sample_every_n = max(1, sample_every_n)
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.frames_read = start_frame  # index one past the last frame consumed
+        self._cap = None
+
+    def __enter__(self) -> "OpenCVFrameSource":
+        self._cap = cv2.VideoCapture(self.video_path)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Could not open video: {self.video_path}")
+        if self.start_frame > 0:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        cap = self._cap
+        while self.end_frame is None or self.frames_read < self.end_frame:
+            idx = self.frames_read
+            if not _is_sampled(idx, self.sample_every_n):
+                if not cap.grab():
+                    return
+                self.frames_read += 1
+                continue
+
+            ok, frame = cap.read()
+            if not ok:
+                return
+            self.frames_read += 1
+            yield idx, frame
+
+
+class FFmpegFrameSource:
+    """
+    ffmpeg rawvideo pipe. Frame decimation (select filter) and downscaling happen inside ffmpeg,
+    so only sampled frames, already at analysis size, are converted and copied into Python.
+    Segments seek to their start time (constant frame rate assumed, see _cmd).
+    """
+
+    name = "ffmpeg"
+
+    def __init__(
+        self,
+        video_path: str,
+        sample_every_n: int = 1,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        max_side: int = CV_DECODE_MAX_SIDE,
+        info: Optional[Dict[str, Any]] = None,
+    ):
+        self.video_path = video_path
+        self.sample_every_n = max(1, sample_every_n)
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.frames_read = start_frame
+        self.info = info or probe_video(video_path)
+
+        w, h = self.info["width"], self.info["height"]
+        if w <= 0 or h <= 0:
+            raise RuntimeError("Invalid video dimensions")
+        scale = min(1.0, max_side / float(max(w, h))) if max_side else 1.0
+        # even dimensions keep scalers/encoders happy
+        self.out_w = max(2, int(w * scale) // 2 * 2)
+        self.out_h = max(2, int(h * scale) // 2 * 2)
+        self._proc: Optional[subprocess.Popen] = None
+
+    def _cmd(self, ffmpeg: str) -> list:
+        n = self.sample_every_n
+        start = self.start_frame
+        # A segment seeks to start_frame / fps (input seeking: only from the nearest keyframe), so
+        # segment-parallel runs don't each decode the video from frame 0. That maps frames to time
+        # at a constant rate: on variable-frame-rate video a segment may start a few frames off.
+        # n restarts at 0 after the seek, so it is offset by start_frame to stay absolute.
+        conds = []
+        if n > 1:
+            conds.append(f"not(mod(n+{start + 1}\\,{n}))")
+        if self.end_frame is not None:
+            conds.append(f"lt(n\\,{self.end_frame - start})")
+        filters = [f"select='{'*'.join(conds)}'"] if conds else []
+        if (self.out_w, self.out_h) != (self.info["width"], self.info["height"]):
+            filters.append(f"scale={self.out_w}:{self.out_h}:flags=area")
+
+        cmd = [ffmpeg, "-v", "error", "-nostdin"]
+        if start > 0:
+            cmd += ["-ss", f"{start / self.info['fps']:.6f}"]
+        cmd += ["-i", self.video_path, "-an"]
+        if filters:
+            cmd += ["-vf", ",".join(filters)]
+        cmd += ["-vsync", "0", "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+        return cmd
+
+    def __enter__(self) -> "FFmpegFrameSource":
+        ffmpeg = ffmpeg_exe()
+        if not ffmpeg:
+            raise RuntimeError("ffmpeg not found")
+        self._proc = subprocess.Popen(
+            self._cmd(ffmpeg),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=self.out_w * self.out_h * 3,
+        )
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._proc is not None:
+            self._proc.stdout.close()
+            if self._proc.poll() is None:
+                self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        frame_bytes = self.out_w * self.out_h * 3
+        n = self.sample_every_n
+        # first sampled absolute frame at or after start_frame
+        first = self.start_frame + (-(self.start_frame + 1)) % n
+        piped = 0  # sampled frames actually read from the pipe
+        while self.end_frame is None or first + piped * n < self.end_frame:
+            buf = self._proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                # Unsampled frames after the last sample never reach the pipe; count the ones the
+                # container reports (at most n - 1), as the OpenCV source does by grab()bing them
+                if self.frames_read < self.info["frames_total"] <= first + piped * n:
+                    self.frames_read = self.info["frames_total"]
+                return
+            idx = first + piped * n
+            piped += 1
+            self.frames_read = idx + 1  # the decoder has consumed every frame up to this sample
+            yield idx, np.frombuffer(buf, dtype=np.uint8).reshape(self.out_h, self.out_w, 3)
+
+
+def open_frame_source(
+    video_path: str,
+    sample_every_n: int = 1,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    kind: str = CV_FRAME_SOURCE,
+    info: Optional[Dict[str, Any]] = None,
+):
+    """Frame source selected by CV_FRAME_SOURCE ("opencv" or "ffmpeg"; ffmpeg falls back to opencv)."""
+    if kind == "ffmpeg" and ffmpeg_exe():
+        return FFmpegFrameSource(video_path, sample_every_n, start_frame, end_frame, info=info)
+    return OpenCVFrameSource(video_path, sample_every_n, start_frame, end_frame)
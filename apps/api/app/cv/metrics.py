@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .timeline import LandmarkTimeline
+
+# MediaPipe Pose landmark ids
+L_SHOULDER, R_SHOULDER = 11, 12
+L_HIP, R_HIP = 23, 24
+L_KNEE, R_KNEE = 25, 26
+L_ANKLE, R_ANKLE = 27, 28
+
+# Per-side landmark ids in a fixed order: shoulder, hip, knee, ankle
+_LEFT = np.array([L_SHOULDER, L_HIP, L_KNEE, L_ANKLE])
+_RIGHT = np.array([R_SHOULDER, R_HIP, R_KNEE, R_ANKLE])
+
+MIN_POSE_FRAMES = 10
+
+
+@dataclass
+class RawMetrics:
+    frames_total: int
+    frames_used: int
+    pose_frames: int
+    avg_torso_lean_deg: Optional[float]
+    overstride_ratio: Optional[float]
+    knee_drive_ratio: Optional[float]
+    vertical_oscillation_norm: Optional[float]
+    cadence_spm_est: Optional[float]
+
+
+def _cadence_spm(ankle_y: np.ndarray, frames_used: int, sample_every_n: int, fps: float) -> Optional[float]:
+    """Steps/min from local maxima of one ankle's vertical position over the sampled frames."""
+    if len(ankle_y) <= 20:
+        return None
+    s = ankle_y - ankle_y.mean()
+    mid = s[1:-1]
+    peaks = int(np.count_nonzero((mid > s[:-2]) & (mid > s[2:])))
+    duration_sec = max(1e-6, (frames_used * sample_every_n) / fps)
+    return float(np.clip((peaks / duration_sec) * 60.0, 120, 220))
+
+
+def compute_metrics(timeline: LandmarkTimeline) -> Dict[str, Any]:
+    """
+    Reduce a landmark timeline to running metrics with whole-array operations.
+    Returns {"ok", "raw_metrics"[, "error"]}, the same shape analyze_running_video always returned.
+    """
+    frames_total = timeline.frames_total
+    frames_used = timeline.frames_used
+
+    lm = np.asarray(timeline.landmarks, dtype=np.float64)
+    lm = lm[~np.isnan(lm[:, 0, 0])]
+    pose_frames = int(len(lm))
+
+    if pose_frames < MIN_POSE_FRAMES:
+        return {
+            "ok": False,
+            "error": "Pose detection confidence too low or too few valid frames",
+            "raw_metrics": RawMetrics(
+                frames_total=frames_total,
+                frames_used=frames_used,
+                pose_frames=pose_frames,
+                avg_torso_lean_deg=None,
+                overstride_ratio=None,
+                knee_drive_ratio=None,
+                vertical_oscillation_norm=None,
+                cadence_spm_est=None,
+            ).__dict__,
+        }
+
+    x = lm[:, :, 0]
+    y = lm[:, :, 1]
+    vis = lm[:, :, 3]
+
+    # Per frame, measure the side whose shoulder/hip/knee/ankle are all more visible
+    use_left = vis[:, _LEFT].min(axis=1) >= vis[:, _RIGHT].min(axis=1)
+    side = np.where(use_left[:, None], _LEFT, _RIGHT)  # (pose_frames, 4)
+    rows = np.arange(pose_frames)[:, None]
+    sx = x[rows, side]
+    sy = y[rows, side]
+    sh_x, hip_x, ankle_x = sx[:, 0], sx[:, 1], sx[:, 3]
+    sh_y, hip_y, knee_y = sy[:, 0], sy[:, 1], sy[:, 2]
+
+    torso_leans = np.abs(np.degrees(np.arctan2(sh_x - hip_x, -(sh_y - hip_y))))
+
+    hip_center_x = (x[:, L_HIP] + x[:, R_HIP]) / 2.0
+    hip_center_y = (y[:, L_HIP] + y[:, R_HIP]) / 2.0
+    shoulder_center_x = (x[:, L_SHOULDER] + x[:, R_SHOULDER]) / 2.0
+    shoulder_center_y = (y[:, L_SHOULDER] + y[:, R_SHOULDER]) / 2.0
+    body_scale = np.maximum(
+        0.05, np.hypot(shoulder_center_x - hip_center_x, shoulder_center_y - hip_center_y)
+    )
+
+    overstride = np.abs(ankle_x - hip_x) / body_scale
+    knee_drive = np.abs(hip_y - knee_y) / body_scale
+
+    vertical_oscillation_norm = float(np.std(hip_center_y)) if pose_frames > 5 else None
+
+    try:
+        cadence_spm_est = _cadence_spm(
+            y[:, L_ANKLE], frames_used, timeline.sample_every_n, timeline.fps
+        )
+    except Exception:
+        cadence_spm_est = None
+
+    return {
+        "ok": True,
+        "raw_metrics": RawMetrics(
+            frames_total=frames_total,
+            frames_used=frames_used,
+            pose_frames=pose_frames,
+            avg_torso_lean_deg=float(np.median(torso_leans)),
+            overstride_ratio=float(np.median(overstride)),
+            knee_drive_ratio=float(np.median(knee_drive)),
+            vertical_oscillation_norm=vertical_oscillation_norm,
+            cadence_spm_est=cadence_spm_est,
+        ).__dict__,
+    }
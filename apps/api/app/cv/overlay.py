@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from .ffmpeg import FFmpegVideoWriter
+from .timeline import LandmarkTimeline
+
+
+def _to_landmark_list(row: np.ndarray):
+    from mediapipe.framework.formats import landmark_pb2
+
+    lm_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, vis in row.tolist():
+        lm_list.landmark.add(x=x, y=y, z=z, visibility=vis)
+    return lm_list
+
+
+def render_pose_overlay(
+    input_path: str,
+    output_path: str,
+    timeline: LandmarkTimeline,
+    max_frames: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> None:
+    """
+    Generate an annotated overlay video from an already-computed landmark timeline.
+    No pose inference happens here: frames that were not sampled get interpolated landmarks.
+    Annotated frames are piped straight into one ffmpeg/libx264 encode (see FFmpegVideoWriter),
+    so the browser-safe MP4 is written in a single pass with no temp video.
+    `progress(frames_written, frames_total)` is called after every frame (callers throttle).
+    Raises exception on failure (caller can fallback to copy).
+    """
+    import mediapipe as mp
+
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise RuntimeError("Could not open input video for overlay generation")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if not fps or fps <= 0:
+        fps = 30.0
+
+    mp_pose = mp.solutions.pose
+    mp_drawing = mp.solutions.drawing_utils
+    mp_drawing_styles = mp.solutions.drawing_styles
+    landmark_style = mp_drawing_styles.get_default_pose_landmarks_style()
+
+    per_frame = timeline.dense(max(timeline.frames_decoded, timeline.frames_total))
+    frame_count = 0
+    writer: FFmpegVideoWriter | None = None
+
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+
+            frame_count += 1
+            if max_frames is not None and frame_count > max_frames:
+                break
+
+            if writer is None:
+                # size from the decoded frame, not container metadata (rotation)
+                height, width = frame.shape[:2]
+                writer = FFmpegVideoWriter(output_path, width, height, fps)
+
+            annotated = frame  # fresh buffer per read(), safe to draw on
+
+            i = frame_count - 1
+            if i < len(per_frame) and not np.isnan(per_frame[i, 0, 0]):
+                mp_drawing.draw_landmarks(
+                    annotated,
+                    _to_landmark_list(per_frame[i]),
+                    mp_pose.POSE_CONNECTIONS,
+                    landmark_drawing_spec=landmark_style,
+                )
+
+            cv2.putText(
+                annotated,
+                "Running Coach Pose Overlay",
+                (12, 28),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.7,
+                (255, 255, 255),
+                2,
+                cv2.LINE_AA,
+            )
+
+            writer.write(annotated)
+            if progress is not None:
+                progress(frame_count, timeline.frames_total)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        cap.release()
+
+    if writer is None:
+        raise RuntimeError("No frames decoded for overlay generation")
+    writer.close()
+
+    # We intentionally do not raise if no pose frames detected; overlay is still useful for demo.
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from .config import CV_MODEL_COMPLEXITY
+
+
+def create_pose(model_complexity: int = CV_MODEL_COMPLEXITY):
+    """Build the MediaPipe Pose graph used for running analysis (video / tracking mode)."""
+    import mediapipe as mp
+
+    return mp.solutions.pose.Pose(
+        static_image_mode=False,
+        model_complexity=model_complexity,
+        enable_segmentation=False,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+
+
+def reset_pose(pose) -> None:
+    """Clear tracking state so a reused Pose instance doesn't carry landmarks between videos."""
+    reset = getattr(pose, "reset", None)
+    if callable(reset):
+        reset()
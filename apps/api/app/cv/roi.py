@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import CV_MAX_INFER_SIDE, CV_ROI_ENABLED, CV_ROI_MARGIN
+
+# Crops never shrink below this fraction of the frame, so a partial detection can't lock onto a limb
+_MIN_ROI_FRAC = 0.25
+_VISIBLE = 0.3
+# Re-anchor once the runner's landmarks come within this fraction of the crop's edge
+_EDGE_FRAC = 0.05
+
+
+class RoiTracker:
+    """
+    Feeds the Pose graph a fixed crop around the runner and caps the inference resolution.
+    MediaPipe's video mode tracks and smooths landmarks across frames, so the crop must not move
+    or change size between frames: it is anchored once on a detection and only re-anchored when
+    the runner reaches its edge (or is lost, which falls back to the full frame). update() reports
+    those re-anchors so the caller can reset the graph's tracking state.
+    Landmarks detected on the crop are mapped back to full-frame normalized coordinates,
+    so downstream metrics see the same coordinate system as full-frame inference.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        enabled: bool = CV_ROI_ENABLED,
+        margin: float = CV_ROI_MARGIN,
+        max_side: int = CV_MAX_INFER_SIDE,
+    ):
+        self.width = width
+        self.height = height
+        self.enabled = enabled and width > 0 and height > 0
+        self.margin = margin
+        self.max_side = max_side
+        self.roi: Optional[Tuple[int, int, int, int]] = None  # x0, y0, x1, y1 in pixels
+
+    def prepare(self, frame_bgr: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int, int, int]]:
+        """Crop + downscale + BGR->RGB. Returns the model input and the crop box used."""
+        h, w = frame_bgr.shape[:2]
+        x0, y0, x1, y1 = self.roi if (self.enabled and self.roi) else (0, 0, w, h)
+        crop = frame_bgr[y0:y1, x0:x1]
+
+        ch, cw = crop.shape[:2]
+        longest = max(ch, cw)
+        if self.max_side and longest > self.max_side:
+            scale = self.max_side / float(longest)
+            crop = cv2.resize(
+                crop,
+                (max(1, int(round(cw * scale))), max(1, int(round(ch * scale)))),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), (x0, y0, x1, y1)
+
+    def to_full_frame(self, row: np.ndarray, box: Tuple[int, int, int, int], frame_w: int, frame_h: int) -> np.ndarray:
+        """Map (33, 4) crop-normalized landmarks to full-frame normalized coordinates (in place)."""
+        x0, y0, x1, y1 = box
+        cw, ch = x1 - x0, y1 - y0
+        if (cw, ch) == (frame_w, frame_h):
+            return row
+        row[:, 0] = (x0 + row[:, 0] * cw) / frame_w
+        row[:, 1] = (y0 + row[:, 1] * ch) / frame_h
+        row[:, 2] = row[:, 2] * cw / frame_w  # z is on the same scale as x
+        return row
+
+    def update(self, row: Optional[np.ndarray]) -> bool:
+        """
+        Decide the crop for the next frame from full-frame landmarks (None = no detection).
+        Returns True when the crop changed, i.e. the Pose graph should be reset before the next frame.
+        """
+        if not self.enabled:
+            return False
+        if row is None:
+            changed = self.roi is not None  # lost the runner: back to the full frame
+            self.roi = None
+        else:
+            pts = row[row[:, 3] >= _VISIBLE] if np.any(row[:, 3] >= _VISIBLE) else row
+            xs = pts[:, 0] * self.width
+            ys = pts[:, 1] * self.height
+            body = (float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max()))
+            if self.roi is not None and self._inside(body):
+                return False
+            roi = self._anchor(body)
+            changed = roi != self.roi
+            self.roi = roi
+        return changed
+
+    def _inside(self, body: Tuple[float, float, float, float]) -> bool:
+        """Body box still clear of the crop's edge band (so the runner hasn't started to leave it)."""
+        x0, y0, x1, y1 = self.roi
+        edge_x = _EDGE_FRAC * (x1 - x0)
+        edge_y = _EDGE_FRAC * (y1 - y0)
+        # A crop side that sits on the frame border can't be left through, so it has no band
+        return (
+            (body[0] >= x0 + edge_x or x0 == 0)
+            and (body[1] >= y0 + edge_y or y0 == 0)
+            and (body[2] <= x1 - edge_x or x1 == self.width)
+            and (body[3] <= y1 - edge_y or y1 == self.height)
+        )
+
+    def _anchor(self, body: Tuple[float, float, float, float]) -> Optional[Tuple[int, int, int, int]]:
+        bx0, by0, bx1, by1 = body
+        bw = max(bx1 - bx0, _MIN_ROI_FRAC * self.width)
+        bh = max(by1 - by0, _MIN_ROI_FRAC * self.height)
+        cx, cy = (bx0 + bx1) / 2.0, (by0 + by1) / 2.0
+        half_w = bw * (0.5 + self.margin)
+        half_h = bh * (0.5 + self.margin)
+
+        x0 = int(max(0, cx - half_w))
+        y0 = int(max(0, cy - half_h))
+        x1 = int(min(self.width, cx + half_w))
+        y1 = int(min(self.height, cy + half_h))
+        if x1 - x0 < 16 or y1 - y0 < 16 or (x0, y0, x1, y1) == (0, 0, self.width, self.height):
+            return None
+        return x0, y0, x1, y1
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .config import RUBRIC_VERSION
+
+# The rubric every job was scored with before rubrics were versioned
+BASELINE_RUBRIC_VERSION = "0.2.1-cv-overlay-ffmpeg"
+
+
+@dataclass(frozen=True)
+class Rubric:
+    """
+    Thresholds and weights that turn raw running metrics into a score.
+    Rubrics are immutable and identified by `version`; scores are stored per version, so changing
+    a threshold means registering a new rubric (and re-scoring history with it), never editing one.
+    """
+
+    version: str
+
+    # Below this many pose frames the clip is treated as not analyzable
+    min_pose_frames: int = 15
+
+    # Torso lean (deg): 100 inside [ideal_low, ideal_high], linear down to 40 at bad_low/bad_high
+    posture_ideal: Tuple[float, float] = (5.0, 15.0)
+    posture_bad: Tuple[float, float] = (0.0, 25.0)
+
+    # Overstride ratio: 100 at or below good, linear down to floor at bad
+    stride_good: float = 1.2
+    stride_bad: float = 2.2
+    stride_floor: int = 45
+
+    # Vertical oscillation (normalized): 100 at or below good, linear down to floor at bad
+    stability_good: float = 0.015
+    stability_bad: float = 0.05
+    stability_floor: int = 45
+
+    # Cadence (spm): 100 inside ideal, `bad` outside the bad range, `mid` in between
+    cadence_ideal: Tuple[float, float] = (160.0, 185.0)
+    cadence_bad: Tuple[float, float] = (145.0, 205.0)
+    cadence_mid: int = 80
+    cadence_bad_score: int = 50
+
+    # Score used for a subscore whose metric is missing
+    missing_score: int = 60
+
+    # posture, stride, stability, cadence_proxy
+    weights: Tuple[float, float, float, float] = (0.30, 0.35, 0.20, 0.15)
+
+    # Subscores below this trigger the matching tip
+    tip_threshold: int = 75
+
+
+_REGISTRY: Dict[str, Rubric] = {}
+
+
+def register_rubric(rubric: Rubric) -> Rubric:
+    existing = _REGISTRY.get(rubric.version)
+    if existing is not None and existing != rubric:
+        raise ValueError(f"Rubric {rubric.version} is already registered with different settings")
+    _REGISTRY[rubric.version] = rubric
+    return rubric
+
+
+def get_rubric(version: Optional[str] = None) -> Rubric:
+    """Registered rubric by version (default: the active RUBRIC_VERSION). Raises KeyError if unknown."""
+    key = version or RUBRIC_VERSION
+    try:
+        return _REGISTRY[key]
+    except KeyError:
+        raise KeyError(f"Unknown rubric version: {key}")
+
+
+def list_rubrics() -> List[str]:
+    return sorted(_REGISTRY)
+
+
+register_rubric(Rubric(version=BASELINE_RUBRIC_VERSION))
@@ -1,187 +1,232 @@
 from __future__ import annotations
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
 
+import numpy as np
 
-def _score_range(value, ideal_low, ideal_high, bad_low, bad_high) -> int:
-    if value is None:
-        return 60
+from .rubrics import Rubric, get_rubric
 
-    if ideal_low <= value <= ideal_high:
-        return 100
+_CORE_KEYS = ("avg_torso_lean_deg", "overstride_ratio", "vertical_oscillation_norm", "cadence_spm_est")
 
-    if value < ideal_low:
-        if value <= bad_low:
-            return 40
-        frac = (value - bad_low) / max(1e-6, (ideal_low - bad_low))
-        return int(40 + 60 * frac)
+_NO_POSE_MSG = "No running subject detected or pose landmarks were insufficient for analysis."
+_FEW_POSE_MSG = "Insufficient pose landmarks for reliable running-form analysis."
+_NO_MOTION_MSG = (
+    "A person may be visible, but the video does not appear to contain enough running motion for analysis."
+)
+_SIDE_VIEW_MSG = "Best results come from side-view videos with full body visible."
 
-    if value > ideal_high:
-        if value >= bad_high:
-            return 40
-        frac = (bad_high - value) / max(1e-6, (bad_high - ideal_high))
-        return int(40 + 60 * frac)
+_TIPS = {
+    "posture": "Maintain a slight forward lean from the ankles, not by bending at the waist.",
+    "stride": "Try landing with your foot closer under your hips to reduce overstriding.",
+    "stability": "Focus on smooth forward motion and reduce excess vertical bounce.",
+    "cadence_proxy": "Try slightly quicker, lighter steps to improve cadence and reduce braking forces.",
+}
+_SOLID_TIP = "Form looks solid overall. Maintain consistency and gradually build volume."
+_NO_RUNNER_TIPS = (
+    "We could not confidently analyze running form in this video.",
+    "Please make sure the video is of someone running (preferably side-view) with the full body visible.",
+)
+_NAN = float("nan")
 
-    return 60
-
-
-def _no_runner_result(raw: Dict[str, Any], message: str) -> Dict[str, Any]:
-    pose_frames = raw.get("pose_frames")
-    frames_used = raw.get("frames_used")
 
+def _to_int(value) -> int:
     try:
-        pose_frames_i = int(pose_frames) if pose_frames is not None else 0
+        return int(value) if value is not None else 0
     except Exception:
-        pose_frames_i = 0
+        return 0
+
 
+def _to_float(value) -> float:
     try:
-        frames_used_i = int(frames_used) if frames_used is not None else 0
+        return float(value)
     except Exception:
-        frames_used_i = 0
+        return float("nan")
 
-    return {
-        "score": 0,
-        "subscores": {
-            "posture": 0,
-            "stride": 0,
-            "stability": 0,
-            "cadence_proxy": 0,
-        },
-        "tips": [
-            "We could not confidently analyze running form in this video.",
-            "Please make sure the video is of someone running (preferably side-view) with the full body visible.",
-        ],
-        "warnings": [
-            message,
-            "Best results come from side-view videos with full body visible.",
-        ],
-        "metrics": {
-            "avg_torso_lean_deg": raw.get("avg_torso_lean_deg"),
-            "overstride_ratio": raw.get("overstride_ratio"),
-            "knee_drive_ratio": raw.get("knee_drive_ratio"),
-            "vertical_oscillation_norm": raw.get("vertical_oscillation_norm"),
-            "cadence_spm_est": raw.get("cadence_spm_est"),
-            "pose_frames": pose_frames_i,
-            "frames_used": frames_used_i,
-        },
-    }
 
+def _columns(raw: Dict[str, Any]) -> tuple:
+    core = [raw.get(k) for k in _CORE_KEYS]
+    return (
+        _to_int(raw.get("pose_frames")),
+        _to_int(raw.get("frames_used")),
+        sum(v is not None for v in core),
+        *(_to_float(v) if v is not None else _NAN for v in core),
+    )
 
-def score_running_form(raw: Dict[str, Any]) -> Dict[str, Any]:
-    pose_frames = raw.get("pose_frames")
-    frames_used = raw.get("frames_used")
 
-    try:
-        pose_frames_i = int(pose_frames) if pose_frames is not None else 0
-    except Exception:
-        pose_frames_i = 0
+def _metrics_out(raw: Dict[str, Any], pose_frames: int, frames_used: int) -> Dict[str, Any]:
+    return {
+        "avg_torso_lean_deg": raw.get("avg_torso_lean_deg"),
+        "overstride_ratio": raw.get("overstride_ratio"),
+        "knee_drive_ratio": raw.get("knee_drive_ratio"),
+        "vertical_oscillation_norm": raw.get("vertical_oscillation_norm"),
+        "cadence_spm_est": raw.get("cadence_spm_est"),
+        "pose_frames": pose_frames,
+        "frames_used": frames_used,
+    }
 
-    try:
-        frames_used_i = int(frames_used) if frames_used is not None else 0
-    except Exception:
-        frames_used_i = 0
 
-    # 1) Hard fail: no pose detected
-    if pose_frames_i == 0 or frames_used_i == 0:
-        return _no_runner_result(
-            raw,
-            "No running subject detected or pose landmarks were insufficient for analysis.",
-        )
+def _range_scores(v: np.ndarray, ideal, bad, missing: int) -> np.ndarray:
+    """Vectorized _score_range (NaN = missing metric)."""
+    ideal_low, ideal_high = ideal
+    bad_low, bad_high = bad
+    with np.errstate(invalid="ignore"):
+        low = np.trunc(40 + 60 * ((v - bad_low) / max(1e-6, (ideal_low - bad_low))))
+        high = np.trunc(40 + 60 * ((bad_high - v) / max(1e-6, (bad_high - ideal_high))))
+        return np.select(
+            [
+                np.isnan(v),
+                (v >= ideal_low) & (v <= ideal_high),
+                v <= bad_low,
+                v < ideal_low,
+                v >= bad_high,
+            ],
+            [missing, 100, 40, low, 40],
+            default=high,
+        ).astype(np.int64)
+
+
+def _falloff_scores(v: np.ndarray, good: float, bad: float, floor: int, missing: int) -> np.ndarray:
+    """100 at or below `good`, `floor` at or above `bad`, linear (truncated) in between."""
+    with np.errstate(invalid="ignore"):
+        mid = np.trunc(100 - ((v - good) / (bad - good)) * (100 - floor))
+        return np.select(
+            [np.isnan(v), v <= good, v >= bad],
+            [missing, 100, floor],
+            default=mid,
+        ).astype(np.int64)
+
+
+# Raw metrics scoring reads, and the columns of the block score_columns() consumes (see raw_columns)
+METRIC_KEYS = ("pose_frames", "frames_used") + _CORE_KEYS
+RAW_COLUMNS = ("pose_frames", "frames_used", "core_present") + _CORE_KEYS
+
+# Scoring gate per record: 0 = scored, else why the clip was rejected
+GATE_MESSAGES = (None, _NO_POSE_MSG, _FEW_POSE_MSG, _NO_MOTION_MSG)
+
+# Tips only depend on which subscores fall below the threshold (bit i = subscore i, in
+# posture/stride/stability/cadence_proxy order), so all 16 lists are built once
+_TIP_SETS = [
+    ([tip for bit, tip in enumerate(_TIPS.values()) if key & (1 << bit)] or [_SOLID_TIP])[:3]
+    for key in range(16)
+]
+
+
+def raw_columns(raws: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """(n, len(RAW_COLUMNS)) float64 block from raw-metric dicts; missing metrics are NaN."""
+    return np.array([_columns(r) for r in raws], dtype=np.float64).reshape(len(raws), len(RAW_COLUMNS))
+
+
+def score_columns(block: np.ndarray, rubric: Optional[Rubric] = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized scoring of a RAW_COLUMNS block with one rubric.
+    Returns int64 arrays: score, posture, stride, stability, cadence_proxy, gate (index into
+    GATE_MESSAGES; rejected records score 0) and tip_key (see tips_for).
+    """
+    rubric = rubric or get_rubric()
+    pose_frames = block[:, 0]
+    frames_used = block[:, 1]
+    present = block[:, 2]
+    cols = {k: block[:, 3 + j] for j, k in enumerate(_CORE_KEYS)}
+
+    no_pose = (pose_frames == 0) | (frames_used == 0)
+    few_pose = ~no_pose & (pose_frames < rubric.min_pose_frames)
+    no_motion = ~no_pose & ~few_pose & (present <= 1)
+    gate = np.select([no_pose, few_pose, no_motion], [1, 2, 3], default=0).astype(np.int64)
+
+    posture = _range_scores(cols["avg_torso_lean_deg"], rubric.posture_ideal, rubric.posture_bad, rubric.missing_score)
+    stride = _falloff_scores(
+        cols["overstride_ratio"], rubric.stride_good, rubric.stride_bad, rubric.stride_floor, rubric.missing_score
+    )
+    stability = _falloff_scores(
+        cols["vertical_oscillation_norm"],
+        rubric.stability_good,
+        rubric.stability_bad,
+        rubric.stability_floor,
+        rubric.missing_score,
+    )
 
-    # 2) Reliability fail: too few pose frames
-    if pose_frames_i < 15:
-        return _no_runner_result(
-            raw,
-            "Insufficient pose landmarks for reliable running-form analysis.",
-        )
+    cad = cols["cadence_spm_est"]
+    with np.errstate(invalid="ignore"):
+        cadence_proxy = np.select(
+            [
+                np.isnan(cad),
+                (cad >= rubric.cadence_ideal[0]) & (cad <= rubric.cadence_ideal[1]),
+                (cad < rubric.cadence_bad[0]) | (cad > rubric.cadence_bad[1]),
+            ],
+            [rubric.missing_score, 100, rubric.cadence_bad_score],
+            default=rubric.cadence_mid,
+        ).astype(np.int64)
+
+    w_posture, w_stride, w_stability, w_cadence = rubric.weights
+    score = np.round(
+        w_posture * posture + w_stride * stride + w_stability * stability + w_cadence * cadence_proxy
+    ).astype(np.int64)
+
+    low = np.stack([posture, stride, stability, cadence_proxy], axis=1) < rubric.tip_threshold
+    tip_key = (low * np.array([1, 2, 4, 8])).sum(axis=1).astype(np.int64)
+
+    rejected = gate != 0
+    for arr in (score, posture, stride, stability, cadence_proxy):
+        arr[rejected] = 0
+    return {
+        "score": score,
+        "posture": posture,
+        "stride": stride,
+        "stability": stability,
+        "cadence_proxy": cadence_proxy,
+        "gate": gate,
+        "tip_key": tip_key,
+    }
 
-    # 3) New guard: person may be visible, but no usable running metrics were extracted
-    core_metrics = [
-        raw.get("avg_torso_lean_deg"),
-        raw.get("overstride_ratio"),
-        raw.get("vertical_oscillation_norm"),
-        raw.get("cadence_spm_est"),
-    ]
-    present_core_metrics = sum(v is not None for v in core_metrics)
-
-    # If almost nothing is available, treat as invalid/non-running clip
-    if present_core_metrics <= 1:
-        return _no_runner_result(
-            raw,
-            "A person may be visible, but the video does not appear to contain enough running motion for analysis.",
-        )
 
-    posture = _score_range(
-        raw.get("avg_torso_lean_deg"), ideal_low=5, ideal_high=15, bad_low=0, bad_high=25
+def tips_for(gate: int, tip_key: int) -> List[str]:
+    if gate:
+        return list(_NO_RUNNER_TIPS)
+    return list(_TIP_SETS[tip_key])
+
+
+def warnings_for(gate: int) -> List[str]:
+    if gate:
+        return [GATE_MESSAGES[gate], _SIDE_VIEW_MSG]
+    return [_SIDE_VIEW_MSG]
+
+
+def score_batch(raws: Sequence[Dict[str, Any]], rubric: Optional[Rubric] = None) -> List[Dict[str, Any]]:
+    """
+    Score many raw-metric records (as produced by cv.metrics.compute_metrics) with one rubric.
+    Validity gates and subscores are evaluated column-wise in one numpy pass (score_columns);
+    only the per-record result dicts are built in Python. Matches score_running_form record for record.
+    """
+    if not raws:
+        return []
+    block = raw_columns(raws)
+    res = score_columns(block, rubric)
+
+    rows = zip(
+        raws,
+        res["gate"].tolist(),
+        res["tip_key"].tolist(),
+        res["score"].tolist(),
+        res["posture"].tolist(),
+        res["stride"].tolist(),
+        res["stability"].tolist(),
+        res["cadence_proxy"].tolist(),
+        block[:, 0].astype(np.int64).tolist(),
+        block[:, 1].astype(np.int64).tolist(),
     )
+    out: List[Dict[str, Any]] = []
+    for raw, gate, tip_key, score, p, s, st, c, pf, fu in rows:
+        out.append(
+            {
+                "score": score,
+                "subscores": {"posture": p, "stride": s, "stability": st, "cadence_proxy": c},
+                "tips": tips_for(gate, tip_key),
+                "warnings": warnings_for(gate),
+                "metrics": _metrics_out(raw, pf, fu),
+            }
+        )
+    return out
 
-    overstride = raw.get("overstride_ratio")
-    if overstride is None:
-        stride = 60
-    elif overstride <= 1.2:
-        stride = 100
-    elif overstride >= 2.2:
-        stride = 45
-    else:
-        stride = int(100 - ((overstride - 1.2) / (2.2 - 1.2)) * 55)
-
-    vo = raw.get("vertical_oscillation_norm")
-    if vo is None:
-        stability = 60
-    elif vo <= 0.015:
-        stability = 100
-    elif vo >= 0.05:
-        stability = 45
-    else:
-        stability = int(100 - ((vo - 0.015) / (0.05 - 0.015)) * 55)
-
-    cadence = raw.get("cadence_spm_est")
-    if cadence is None:
-        cadence_proxy = 60
-    elif 160 <= cadence <= 185:
-        cadence_proxy = 100
-    elif cadence < 145 or cadence > 205:
-        cadence_proxy = 50
-    else:
-        cadence_proxy = 80
-
-    final_score = int(round(
-        0.30 * posture +
-        0.35 * stride +
-        0.20 * stability +
-        0.15 * cadence_proxy
-    ))
-
-    tips: List[str] = []
-    warnings: List[str] = ["Best results come from side-view videos with full body visible."]
-
-    if posture < 75:
-        tips.append("Maintain a slight forward lean from the ankles, not by bending at the waist.")
-    if stride < 75:
-        tips.append("Try landing with your foot closer under your hips to reduce overstriding.")
-    if stability < 75:
-        tips.append("Focus on smooth forward motion and reduce excess vertical bounce.")
-    if cadence_proxy < 75:
-        tips.append("Try slightly quicker, lighter steps to improve cadence and reduce braking forces.")
-    if not tips:
-        tips.append("Form looks solid overall. Maintain consistency and gradually build volume.")
 
-    return {
-        "score": final_score,
-        "subscores": {
-            "posture": posture,
-            "stride": stride,
-            "stability": stability,
-            "cadence_proxy": cadence_proxy,
-        },
-        "tips": tips[:3],
-        "warnings": warnings,
-        "metrics": {
-            "avg_torso_lean_deg": raw.get("avg_torso_lean_deg"),
-            "overstride_ratio": raw.get("overstride_ratio"),
-            "knee_drive_ratio": raw.get("knee_drive_ratio"),
-            "vertical_oscillation_norm": raw.get("vertical_oscillation_norm"),
-            "cadence_spm_est": raw.get("cadence_spm_est"),
-            "pose_frames": pose_frames_i,
-            "frames_used": frames_used_i,
-        },
-    }
\ No newline at end of file
+def score_running_form(raw: Dict[str, Any], rubric: Optional[Rubric] = None) -> Dict[str, Any]:
+    """Score one raw-metrics record with `rubric` (default: the active rubric, see cv.rubrics)."""
+    return score_batch([raw], rubric)[0]
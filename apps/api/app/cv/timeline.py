@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+NUM_LANDMARKS = 33  # MediaPipe Pose
+LANDMARK_FIELDS = 4  # x, y, z, visibility
+
+
+@dataclass
+class LandmarkTimeline:
+    """
+    Output of one decode + Pose pass over a video.
+    `landmarks[i]` holds the (33, 4) normalized landmarks for source frame `frame_indices[i]`,
+    or NaN when no pose was detected on that sampled frame.
+    """
+
+    fps: float
+    frames_total: int  # frame count reported by the container
+    frames_decoded: int  # frames actually read from the stream
+    width: int
+    height: int
+    sample_every_n: int
+    frame_indices: np.ndarray  # (n_samples,) int32, 0-based
+    landmarks: np.ndarray  # (n_samples, 33, 4) float32
+
+    @property
+    def frames_used(self) -> int:
+        return int(len(self.frame_indices))
+
+    @property
+    def pose_mask(self) -> np.ndarray:
+        return ~np.isnan(self.landmarks[:, 0, 0])
+
+    @property
+    def pose_frames(self) -> int:
+        return int(self.pose_mask.sum())
+
+    @property
+    def timestamps_sec(self) -> np.ndarray:
+        return self.frame_indices.astype(np.float64) / (self.fps or 30.0)
+
+    def dense(self, n_frames: Optional[int] = None, max_gap: Optional[int] = None) -> np.ndarray:
+        """
+        Per-frame landmarks for every source frame (n_frames, 33, 4), linearly interpolated
+        between detected samples. Gaps wider than `max_gap` frames (default 3 samples) stay NaN,
+        and frames before the first / after the last detection hold it for one sample interval.
+        """
+        n = self.frames_decoded if n_frames is None else n_frames
+        step = max(1, self.sample_every_n)
+        max_gap = 3 * step if max_gap is None else max_gap
+
+        flat = NUM_LANDMARKS * LANDMARK_FIELDS
+        out = np.full((n, flat), np.nan, dtype=np.float32)
+
+        mask = self.pose_mask
+        det_idx = self.frame_indices[mask].astype(np.int64)
+        det = self.landmarks[mask].reshape(-1, flat)
+        k = len(det_idx)
+        if k == 0 or n == 0:
+            return out.reshape(n, NUM_LANDMARKS, LANDMARK_FIELDS)
+
+        f = np.arange(n, dtype=np.int64)
+        r = np.searchsorted(det_idx, f, side="left")  # first detection at or after f
+        r_c = np.clip(r, 0, k - 1)
+        l_c = np.clip(r - 1, 0, k - 1)
+        fr = det_idx[r_c]
+        fl = det_idx[l_c]
+
+        gap = fr - fl
+        between = (r > 0) & (r < k) & (gap <= max_gap)
+        t = ((f - fl) / np.maximum(gap, 1)).astype(np.float32)[:, None]
+        interp = det[l_c] + (det[r_c] - det[l_c]) * t
+        out[between] = interp[between]
+
+        exact = fr == f
+        out[exact] = det[r_c][exact]
+
+        lead = (r == 0) & (fr - f <= step)
+        out[lead] = det[0]
+        tail = (r == k) & (f - det_idx[-1] <= step)
+        out[tail] = det[-1]
+
+        return out.reshape(n, NUM_LANDMARKS, LANDMARK_FIELDS)
+
+
+def _timeline_files(base_path: str) -> tuple[str, str, str]:
+    return (
+        f"{base_path}-landmarks.npy",
+        f"{base_path}-frames.npy",
+        f"{base_path}-landmarks.json",
+    )
+
+
+def save_timeline(timeline: LandmarkTimeline, base_path: str) -> str:
+    """
+    Persist a timeline next to its upload as
+      <base>-landmarks.npy  float32 (n_samples, 33, 4)
+      <base>-frames.npy     int32 (n_samples,) source frame index (timestamp = index / fps)
+      <base>-landmarks.json metadata; written last, so its presence means the arrays are complete
+    Returns the metadata path, which is what load_timeline() takes.
+    """
+    lm_path, frames_path, meta_path = _timeline_files(base_path)
+
+    for path, arr in (
+        (lm_path, np.ascontiguousarray(timeline.landmarks, dtype=np.float32)),
+        (frames_path, np.ascontiguousarray(timeline.frame_indices, dtype=np.int32)),
+    ):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, path)
+
+    meta = {
+        "version": 1,
+        "fps": timeline.fps,
+        "frames_total": timeline.frames_total,
+        "frames_decoded": timeline.frames_decoded,
+        "width": timeline.width,
+        "height": timeline.height,
+        "sample_every_n": timeline.sample_every_n,
+        "landmarks": os.path.basename(lm_path),
+        "frames": os.path.basename(frames_path),
+    }
+    tmp = f"{meta_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+    return meta_path
+
+
+def load_timeline(meta_path: str, mmap: bool = True) -> LandmarkTimeline:
+    """Load a saved timeline; arrays are memory-mapped read-only unless mmap=False."""
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    folder = os.path.dirname(meta_path)
+    mode = "r" if mmap else None
+    return LandmarkTimeline(
+        fps=float(meta["fps"]),
+        frames_total=int(meta["frames_total"]),
+        frames_decoded=int(meta["frames_decoded"]),
+        width=int(meta["width"]),
+        height=int(meta["height"]),
+        sample_every_n=int(meta["sample_every_n"]),
+        frame_indices=np.load(os.path.join(folder, meta["frames"]), mmap_mode=mode),
+        landmarks=np.load(os.path.join(folder, meta["landmarks"]), mmap_mode=mode),
+    )
@@ -1,10 +1,52 @@
+import atexit
 import os
+import threading
+import time
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
-try:
-    from databricks import sql as dbsql
-except Exception:
-    dbsql = None
+# "databricks" (remote SQL warehouse) or "duckdb" (embedded file with the same uploads/video_results
+# schema: local dashboards and offline load tests of the write path, no warehouse needed)
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", "databricks").strip().lower()
+# DuckDB database file; only the API process opens it (CV workers just append to the outbox)
+DUCKDB_PATH = os.getenv(
+    "DUCKDB_PATH", os.path.join(os.path.dirname(__file__), "..", "storage", "analytics.duckdb")
+)
+
+# Only the selected backend's driver is imported: both are optional and slow to import,
+# and the API should start fast when analytics isn't configured
+dbsql = None
+duckdb = None
+if ANALYTICS_BACKEND == "duckdb":
+    try:
+        import duckdb
+    except Exception:
+        duckdb = None
+elif os.getenv("DATABRICKS_HOST") and os.getenv("DATABRICKS_TOKEN"):
+    try:
+        from databricks import sql as dbsql
+    except Exception:
+        dbsql = None
+
+# Connections kept per process (API and each CV worker have their own pool)
+DATABRICKS_POOL_SIZE = int(os.getenv("DATABRICKS_POOL_SIZE", "4"))
+# Idle connections older than this are closed instead of reused
+DATABRICKS_POOL_IDLE_SEC = float(os.getenv("DATABRICKS_POOL_IDLE_SEC", "300"))
+# Connections idle longer than this get a `SELECT 1` before reuse
+DATABRICKS_POOL_CHECK_SEC = float(os.getenv("DATABRICKS_POOL_CHECK_SEC", "60"))
+# How long a caller waits for a free connection when the pool is at its size limit
+DATABRICKS_POOL_WAIT_SEC = float(os.getenv("DATABRICKS_POOL_WAIT_SEC", "30"))
+
+
+def _connection_errors() -> tuple:
+    """Exceptions that mean the connection (not the statement) is bad."""
+    errors = [ConnectionError, OSError, TimeoutError]
+    exc = getattr(dbsql, "exc", None)
+    for name in ("OperationalError", "InterfaceError", "RequestError"):
+        cls = getattr(exc, name, None)
+        if isinstance(cls, type):
+            errors.append(cls)
+    return tuple(errors)
 
 
 def _get_db_config():
@@ -34,39 +76,324 @@ def _get_sql_connection():
     return conn
 
 
+# databricks/notebooks/setup_tables.sql in DuckDB types; created on first connect
+_DUCKDB_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS uploads (
+  job_id VARCHAR,
+  created_at TIMESTAMP,
+  video_path VARCHAR,
+  status VARCHAR,
+  overlay_path VARCHAR,
+  rubric_version VARCHAR,
+  error VARCHAR
+)""",
+    """CREATE TABLE IF NOT EXISTS video_results (
+  job_id VARCHAR,
+  overall_score INTEGER,
+  metrics MAP(VARCHAR, STRUCT(mean DOUBLE, score INTEGER)),
+  tips VARCHAR[],
+  overlay_path VARCHAR,
+  rubric_version VARCHAR,
+  created_at TIMESTAMP
+)""",
+)
+
+_duckdb_db = None
+_duckdb_pid: int | None = None
+_duckdb_lock = threading.Lock()
+
+
+def dialect() -> str:
+    """SQL dialect of the configured backend: "databricks" or "duckdb"."""
+    return "duckdb" if ANALYTICS_BACKEND == "duckdb" else "databricks"
+
+
+def _get_duckdb_connection():
+    """
+    A connection to DUCKDB_PATH. The database is opened once per process (DuckDB locks the file)
+    and every pooled connection is a cursor on it, so each thread gets its own connection.
+    """
+    global _duckdb_db, _duckdb_pid
+    if duckdb is None:
+        raise RuntimeError("duckdb is not installed")
+    with _duckdb_lock:
+        if _duckdb_db is None or _duckdb_pid != os.getpid():
+            if DUCKDB_PATH != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(DUCKDB_PATH)), exist_ok=True)
+            db = duckdb.connect(DUCKDB_PATH)
+            for stmt in _DUCKDB_SCHEMA:
+                db.execute(stmt)
+            _duckdb_db, _duckdb_pid = db, os.getpid()
+        return _duckdb_db.cursor()
+
+
+def _close_duckdb() -> None:
+    global _duckdb_db
+    with _duckdb_lock:
+        db, _duckdb_db = _duckdb_db, None
+    if db is not None and _duckdb_pid == os.getpid():
+        try:
+            db.close()
+        except Exception:
+            pass
+
+
+class _Pooled:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of analytics connections (Databricks SQL, or DuckDB cursors).
+    At most `max_size` connections exist at once; idle ones are reused most-recent-first,
+    closed after `idle_timeout`, and health-checked before reuse once idle for `check_after`.
+    A connection that raised a connection-level error is discarded, never returned to the pool.
+    """
+
+    def __init__(
+        self,
+        factory=_get_sql_connection,
+        max_size: int = DATABRICKS_POOL_SIZE,
+        idle_timeout: float = DATABRICKS_POOL_IDLE_SEC,
+        check_after: float = DATABRICKS_POOL_CHECK_SEC,
+        wait_timeout: float = DATABRICKS_POOL_WAIT_SEC,
+    ):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.wait_timeout = wait_timeout
+        self._idle: list[_Pooled] = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    @staticmethod
+    def _close(pooled: _Pooled) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, pooled: _Pooled) -> bool:
+        try:
+            with pooled.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def _reap_locked(self, now: float) -> list:
+        expired = [p for p in self._idle if now - p.last_used > self.idle_timeout]
+        if expired:
+            self._idle = [p for p in self._idle if now - p.last_used <= self.idle_timeout]
+            self._discarded += len(expired)
+        return expired
+
+    def acquire(self, fresh: bool = False) -> tuple:
+        """
+        (pooled, reused) for a connection reserved for the caller; release() it afterwards.
+        fresh=True skips idle connections and always opens a new one.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            with self._cond:
+                expired = self._reap_locked(time.monotonic())
+                pooled = None
+                if self._idle and not fresh:
+                    pooled = self._idle.pop()
+                    self._in_use += 1
+                elif self._in_use < self.max_size:
+                    self._in_use += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a Databricks connection")
+                    self._cond.wait(remaining)
+                    continue
+            for p in expired:
+                self._close(p)
+
+            if pooled is None:
+                # Connect outside the lock; the slot is already reserved
+                try:
+                    pooled = _Pooled(self.factory())
+                except BaseException:
+                    self._give_back_slot()
+                    raise
+                with self._cond:
+                    self._created += 1
+                return pooled, False
+
+            if time.monotonic() - pooled.last_used > self.check_after and not self._healthy(pooled):
+                self._close(pooled)
+                with self._cond:
+                    self._discarded += 1
+                self._give_back_slot()
+                continue
+            with self._cond:
+                self._reused += 1
+            return pooled, True
+
+    def _give_back_slot(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def release(self, pooled: _Pooled, broken: bool = False) -> None:
+        if broken:
+            self._close(pooled)
+            with self._cond:
+                self._discarded += 1
+            self._give_back_slot()
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        pooled, _ = self.acquire()
+        broken = False
+        try:
+            yield pooled.conn
+        except _connection_errors():
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def run(self, fn):
+        """
+        fn(conn) on a pooled connection. If a reused connection fails with a connection-level
+        error it is dropped and fn runs once more on a fresh one (the statement never reached
+        a healthy connection); errors on fresh connections propagate.
+        """
+        errors = _connection_errors()
+        pooled, reused = self.acquire()
+        try:
+            result = fn(pooled.conn)
+        except errors:
+            self.release(pooled, broken=True)
+            if not reused:
+                raise
+        except BaseException:
+            self.release(pooled)
+            raise
+        else:
+            self.release(pooled)
+            return result
+
+        with self._cond:
+            # Idle connections from the same outage are likely stale too: drop them
+            stale, self._idle = self._idle, []
+            self._discarded += len(stale)
+        for p in stale:
+            self._close(p)
+
+        pooled, _ = self.acquire(fresh=True)
+        try:
+            result = fn(pooled.conn)
+        except errors:
+            self.release(pooled, broken=True)
+            raise
+        except BaseException:
+            self.release(pooled)
+            raise
+        self.release(pooled)
+        return result
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for p in idle:
+            self._close(p)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded,
+            }
+
+
+_pool: ConnectionPool | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Process-wide pool (a forked/spawned process builds its own; connections aren't shared across processes)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            factory = _get_duckdb_connection if dialect() == "duckdb" else _get_sql_connection
+            _pool = ConnectionPool(factory=factory)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.close()
+    _close_duckdb()
+
+
+atexit.register(close_pool)
+
+
+def _execute(cur, query: str, params: tuple | None) -> None:
+    if params:
+        cur.execute(query, params)
+    else:
+        cur.execute(query)
+
+
 def execute_sql(query: str, params: tuple | None = None) -> None:
-    conn = _get_sql_connection()
-    try:
+    def run(conn):
         with conn.cursor() as cur:
-            if params:
-                cur.execute(query, params)
-            else:
-                cur.execute(query)
-    finally:
-        conn.close()
+            _execute(cur, query, params)
+
+    get_pool().run(run)
 
 
 def fetch_one(query: str, params: tuple | None = None):
-    conn = _get_sql_connection()
-    try:
+    def run(conn):
         with conn.cursor() as cur:
-            if params:
-                cur.execute(query, params)
-            else:
-                cur.execute(query)
+            _execute(cur, query, params)
             return cur.fetchone()
-    finally:
-        conn.close()
+
+    return get_pool().run(run)
 
 
 def fetch_all(query: str, params: tuple | None = None):
-    conn = _get_sql_connection()
-    try:
+    def run(conn):
         with conn.cursor() as cur:
-            if params:
-                cur.execute(query, params)
-            else:
-                cur.execute(query)
+            _execute(cur, query, params)
             return cur.fetchall()
-    finally:
-        conn.close()
+
+    return get_pool().run(run)
+
+
+def is_configured() -> bool:
+    """DuckDB backend: duckdb installed. Databricks: connector installed and DATABRICKS_HOST/TOKEN set."""
+    if dialect() == "duckdb":
+        return duckdb is not None
+    return dbsql is not None and _get_db_config() is not None
@@ -0,0 +1,386 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .storage import claim_outbox, complete_outbox, enqueue_outbox, outbox_stats, retry_outbox
+
+try:
+    from . import databricks_client
+except Exception:
+    databricks_client = None
+
+# Flush when this many ops are waiting (in this process) or every interval, whichever comes first
+DATABRICKS_SYNC_BATCH = int(os.getenv("DATABRICKS_SYNC_BATCH", "200"))
+DATABRICKS_SYNC_INTERVAL_SEC = float(os.getenv("DATABRICKS_SYNC_INTERVAL_SEC", "2.0"))
+# Failed writes retry with exponential backoff, forever by default (0). With a cap, an op that
+# reaches it is parked in the outbox ("dead" in stats) and holds back its job's later ops.
+DATABRICKS_SYNC_MAX_ATTEMPTS = int(os.getenv("DATABRICKS_SYNC_MAX_ATTEMPTS", "0"))
+DATABRICKS_SYNC_BACKOFF_SEC = float(os.getenv("DATABRICKS_SYNC_BACKOFF_SEC", "2.0"))
+DATABRICKS_SYNC_BACKOFF_MAX_SEC = float(os.getenv("DATABRICKS_SYNC_BACKOFF_MAX_SEC", "300"))
+# A claimed batch is invisible to other flushers for this long (recovers ops from a crashed flusher)
+DATABRICKS_SYNC_LEASE_SEC = float(os.getenv("DATABRICKS_SYNC_LEASE_SEC", "120"))
+
+_active: Optional["DatabricksSync"] = None
+
+
+# --- Enqueue side (API and CV workers) ---
+
+
+def enabled() -> bool:
+    return databricks_client is not None and databricks_client.is_configured()
+
+
+def _enqueue(kind: str, job_id: str, payload: Dict[str, Any]) -> None:
+    # Without Databricks config there is nothing to sync; don't grow the outbox
+    if not enabled():
+        return
+    try:
+        enqueue_outbox(kind, job_id, payload)
+    except Exception:
+        return
+    if _active is not None:
+        _active.notify()
+
+
+def record_upload(job_id: str, video_path: str, status: str = "queued") -> None:
+    _enqueue("upload", job_id, {"video_path": video_path, "status": status, "created_at": time.time()})
+
+
+def record_upload_status(job_id: str, status: str, error: Optional[str] = None) -> None:
+    _enqueue("upload_status", job_id, {"status": status, "error": error})
+
+
+def record_result(
+    job_id: str,
+    overall_score: int,
+    metrics: Dict[str, Dict[str, float]],
+    tips: List[str],
+    rubric_version: str,
+) -> None:
+    """video_results row; `metrics` maps name -> {"score": int, "mean": float}."""
+    _enqueue(
+        "result",
+        job_id,
+        {
+            "overall_score": int(overall_score),
+            "metrics": metrics,
+            "tips": list(tips),
+            "rubric_version": rubric_version,
+            "created_at": time.time(),
+        },
+    )
+
+
+def record_overlay(job_id: str, overlay_path: str) -> None:
+    _enqueue("overlay", job_id, {"overlay_path": overlay_path})
+
+
+# --- SQL building ---
+
+# One MERGE per table per batch, all values bound as `?` parameters. Every source row is one job:
+# is_new rows carry the full row (insert, or overwrite when a batch is replayed after a partial
+# failure), other rows only touch the columns whose set_* flag is true.
+# Expressions that differ between backends (see databricks_client.dialect()):
+_DIALECTS = {
+    "databricks": {
+        "values": "SELECT * FROM VALUES {rows}",
+        "ts": "COALESCE(timestamp_seconds(CAST(? AS DOUBLE)), current_timestamp())",
+        "metrics": "from_json(?, 'MAP<STRING, STRUCT<mean:DOUBLE, score:INT>>')",
+        "tips": "from_json(?, 'ARRAY<STRING>')",
+    },
+    "duckdb": {
+        "values": "SELECT * FROM (VALUES {rows})",
+        "ts": "COALESCE(CAST(to_timestamp(CAST(? AS DOUBLE)) AS TIMESTAMP), CAST(current_timestamp AS TIMESTAMP))",
+        "metrics": "CAST(CAST(? AS JSON) AS MAP(VARCHAR, STRUCT(mean DOUBLE, score INTEGER)))",
+        "tips": "CAST(CAST(? AS JSON) AS VARCHAR[])",
+    },
+}
+
+_UPLOADS_ROW = (
+    "(CAST(? AS STRING), CAST(? AS BOOLEAN), {ts}, "
+    "CAST(? AS STRING), CAST(? AS STRING), CAST(? AS BOOLEAN), CAST(? AS STRING), CAST(? AS BOOLEAN), "
+    "CAST(? AS STRING), CAST(? AS BOOLEAN))"
+)
+_UPLOADS_MERGE = """MERGE INTO uploads t
+USING (
+  {values}
+  AS s(job_id, is_new, created_at, video_path, status, set_status, error, set_error, overlay_path, set_overlay)
+) s
+ON t.job_id = s.job_id
+WHEN MATCHED AND s.is_new THEN UPDATE SET
+  created_at = s.created_at, video_path = s.video_path, status = s.status,
+  overlay_path = s.overlay_path, rubric_version = NULL, error = s.error
+WHEN MATCHED THEN UPDATE SET
+  status = CASE WHEN s.set_status THEN s.status ELSE t.status END,
+  error = CASE WHEN s.set_error THEN s.error ELSE t.error END,
+  overlay_path = CASE WHEN s.set_overlay THEN s.overlay_path ELSE t.overlay_path END
+WHEN NOT MATCHED AND s.is_new THEN INSERT
+  (job_id, created_at, video_path, status, overlay_path, rubric_version, error)
+  VALUES (s.job_id, s.created_at, s.video_path, s.status, s.overlay_path, NULL, s.error)"""
+
+_RESULTS_ROW = (
+    "(CAST(? AS STRING), CAST(? AS BOOLEAN), CAST(? AS INT), {metrics}, {tips}, "
+    "CAST(? AS STRING), CAST(? AS BOOLEAN), CAST(? AS STRING), {ts})"
+)
+_RESULTS_MERGE = """MERGE INTO video_results t
+USING (
+  {values}
+  AS s(job_id, is_new, overall_score, metrics, tips, overlay_path, set_overlay, rubric_version, created_at)
+) s
+ON t.job_id = s.job_id
+WHEN MATCHED AND s.is_new THEN UPDATE SET
+  overall_score = s.overall_score, metrics = s.metrics, tips = s.tips,
+  overlay_path = s.overlay_path, rubric_version = s.rubric_version, created_at = s.created_at
+WHEN MATCHED AND s.set_overlay THEN UPDATE SET overlay_path = s.overlay_path
+WHEN NOT MATCHED AND s.is_new THEN INSERT
+  (job_id, overall_score, metrics, tips, overlay_path, rubric_version, created_at)
+  VALUES (s.job_id, s.overall_score, s.metrics, s.tips, s.overlay_path, s.rubric_version, s.created_at)"""
+
+
+def _fold(ops: List[Dict[str, Any]]) -> tuple:
+    """
+    Collapse a batch of ops (in enqueue order) into per-job final state:
+    new rows for each table, plus column updates for rows that already exist remotely.
+    """
+    upload_rows: Dict[str, Dict[str, Any]] = {}
+    upload_sets: Dict[str, Dict[str, Any]] = {}
+    result_rows: Dict[str, Dict[str, Any]] = {}
+    result_sets: Dict[str, Dict[str, Any]] = {}
+
+    def set_upload(job_id: str, fields: Dict[str, Any]) -> None:
+        if job_id in upload_rows:
+            upload_rows[job_id].update(fields)
+        else:
+            upload_sets.setdefault(job_id, {}).update(fields)
+
+    for op in ops:
+        job_id, p = op["job_id"], op["payload"]
+        kind = op["kind"]
+        if kind == "upload":
+            upload_sets.pop(job_id, None)
+            upload_rows[job_id] = {
+                "job_id": job_id,
+                "created_at": p.get("created_at"),
+                "video_path": p.get("video_path"),
+                "status": p.get("status", "queued"),
+                "overlay_path": None,
+                "rubric_version": None,
+                "error": None,
+            }
+        elif kind == "upload_status":
+            set_upload(job_id, {"status": p.get("status"), "error": p.get("error")})
+        elif kind == "result":
+            result_sets.pop(job_id, None)
+            result_rows[job_id] = {
+                "job_id": job_id,
+                "overall_score": p.get("overall_score"),
+                "metrics": p.get("metrics") or {},
+                "tips": p.get("tips") or [],
+                "overlay_path": None,
+                "rubric_version": p.get("rubric_version"),
+                "created_at": p.get("created_at"),
+            }
+        elif kind == "overlay":
+            set_upload(job_id, {"overlay_path": p.get("overlay_path")})
+            if job_id in result_rows:
+                result_rows[job_id]["overlay_path"] = p.get("overlay_path")
+            else:
+                result_sets.setdefault(job_id, {})["overlay_path"] = p.get("overlay_path")
+    return upload_rows, upload_sets, result_rows, result_sets
+
+
+def _merge_sql(template: str, row: str, n: int, sql: Dict[str, str]) -> str:
+    rows = ", ".join([row.format(**sql)] * n)
+    return template.replace("{values}", sql["values"].format(rows=rows))
+
+
+def _by_job(ops: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Ops grouped per job (groups in order of their oldest op, enqueue order kept within each)."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for op in ops:
+        groups.setdefault(op["job_id"], []).append(op)
+    return list(groups.values())
+
+
+def build_statements(ops: List[Dict[str, Any]], dialect: str = "databricks") -> List[Tuple[str, tuple]]:
+    """
+    (sql, params) per table touched by the batch: at most one uploads MERGE and one video_results
+    MERGE, in the given backend dialect ("databricks" or "duckdb").
+    """
+    sql = _DIALECTS[dialect]
+    upload_rows, upload_sets, result_rows, result_sets = _fold(ops)
+    stmts: List[Tuple[str, tuple]] = []
+
+    params: list = []
+    for r in upload_rows.values():
+        params += [
+            r["job_id"], True, r["created_at"], r["video_path"],
+            r["status"], True, r["error"], True, r["overlay_path"], True,
+        ]
+    for job_id, fields in upload_sets.items():
+        params += [
+            job_id, False, None, None,
+            fields.get("status"), "status" in fields,
+            fields.get("error"), "error" in fields,
+            fields.get("overlay_path"), "overlay_path" in fields,
+        ]
+    n = len(upload_rows) + len(upload_sets)
+    if n:
+        stmts.append((_merge_sql(_UPLOADS_MERGE, _UPLOADS_ROW, n, sql), tuple(params)))
+
+    params = []
+    for r in result_rows.values():
+        params += [
+            r["job_id"], True, r["overall_score"], json.dumps(r["metrics"]), json.dumps(r["tips"]),
+            r["overlay_path"], True, r["rubric_version"], r["created_at"],
+        ]
+    for job_id, fields in result_sets.items():
+        params += [job_id, False, None, None, None, fields.get("overlay_path"), "overlay_path" in fields, None, None]
+    n = len(result_rows) + len(result_sets)
+    if n:
+        stmts.append((_merge_sql(_RESULTS_MERGE, _RESULTS_ROW, n, sql), tuple(params)))
+    return stmts
+
+
+# --- Flusher (API process) ---
+
+
+class DatabricksSync:
+    """
+    Background write-behind flusher for the Databricks outbox.
+    Requests and CV workers only append ops to the durable SQLite outbox (record_* above);
+    this thread leases batches, folds them per job into one parameterized MERGE per table, and
+    retries failed batches with backoff. Ops survive restarts until they are written.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DATABRICKS_SYNC_BATCH,
+        interval: float = DATABRICKS_SYNC_INTERVAL_SEC,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending_hint = 0
+        self._flushed = 0
+        self._failed_batches = 0
+        self._last_error: Optional[str] = None
+
+    def start(self) -> None:
+        global _active
+        if self._thread is not None or not enabled():
+            return
+        _active = self
+        self._thread = threading.Thread(target=self._run, name="databricks-sync", daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        self._pending_hint += 1
+        if self._pending_hint >= self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._pending_hint = 0
+            self._drain()
+
+    def _drain(self) -> None:
+        # Keep going while full batches come back; stop on an empty batch or a failure
+        while not self._stop.is_set():
+            done, ok = self.flush_once()
+            if not ok or done < self.batch_size:
+                return
+
+    def flush_once(self) -> tuple:
+        """Write one batch. Returns (ops claimed, succeeded)."""
+        try:
+            ops = claim_outbox(self.batch_size, DATABRICKS_SYNC_LEASE_SEC, DATABRICKS_SYNC_MAX_ATTEMPTS)
+        except Exception:
+            return 0, False
+        if not ops:
+            return 0, True
+
+        # Jobs whose ops failed before are written one at a time, so a single bad op (a poison
+        # value Databricks rejects) only holds back its own job instead of failing every batch it
+        # lands in. Fewest attempts go first, and the first failure ends the pass (it may as well
+        # be an outage): the jobs not tried wait out the same backoff without spending an attempt,
+        # so a poison op sinks to the back instead of starving the jobs behind it.
+        suspects: List[List[Dict[str, Any]]] = []
+        fresh: List[Dict[str, Any]] = []
+        for group in _by_job(ops):
+            if any(op["attempts"] for op in group):
+                suspects.append(group)
+            else:
+                fresh.extend(group)
+        suspects.sort(key=lambda group: max(op["attempts"] for op in group))
+
+        ok = True
+        for i, group in enumerate(suspects):
+            if not self._write(group):
+                ok = False
+                untried = [op for g in suspects[i + 1:] for op in g]
+                self._release(untried, self._last_error, max(op["attempts"] for op in group), attempted=False)
+                break
+        if fresh and not self._write(fresh):
+            ok = False
+        return len(ops), ok
+
+    def _write(self, ops: List[Dict[str, Any]]) -> bool:
+        """One transaction's worth of ops: completed on success, released with backoff on failure."""
+        try:
+            for sql, params in build_statements(ops, databricks_client.dialect()):
+                databricks_client.execute_sql(sql, params)
+        except Exception as e:
+            self._failed_batches += 1
+            self._last_error = str(e)
+            self._release(ops, str(e), max(op["attempts"] for op in ops))
+            return False
+        complete_outbox([op["id"] for op in ops])
+        self._flushed += len(ops)
+        return True
+
+    def _release(self, ops: List[Dict[str, Any]], error: Optional[str], attempts: int, attempted: bool = True) -> None:
+        """Hand leased ops back after the backoff for `attempts`; `attempted` counts this try."""
+        if not ops:
+            return
+        delay = min(DATABRICKS_SYNC_BACKOFF_MAX_SEC, DATABRICKS_SYNC_BACKOFF_SEC * (2 ** attempts))
+        try:
+            retry_outbox([op["id"] for op in ops], error or "", delay, attempted=attempted)
+        except Exception:
+            pass  # lease expiry hands the ops back anyway
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the thread after one last flush attempt (anything left stays in the outbox)."""
+        global _active
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        if _active is self:
+            _active = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            done, ok = self.flush_once()
+            if not ok or done == 0:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        out = {
+            "running": self._thread is not None,
+            "flushed": self._flushed,
+            "failed_batches": self._failed_batches,
+            "last_error": self._last_error,
+        }
+        try:
+            out.update(outbox_stats(DATABRICKS_SYNC_MAX_ATTEMPTS))
+        except Exception:
+            pass
+        return out
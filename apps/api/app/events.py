@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Per-subscriber buffer; a slow client drops its oldest progress events, never blocks publishers
+SUBSCRIBER_QUEUE_SIZE = 256
+# Last event per job, replayed to late subscribers (bounded, oldest jobs evicted first)
+LAST_EVENT_JOBS = 1024
+
+
+class JobEventBroker:
+    """
+    Fans job progress/stage events out to /results/{job_id}/events subscribers.
+    publish() is thread-safe (called from worker pool threads); subscriber queues live on the
+    event loop given to attach_loop().
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._last: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def detach_loop(self) -> None:
+        self._loop = None
+
+    def last_event(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._last.get(job_id)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        job_id = event.get("job_id")
+        if not job_id:
+            return
+        with self._lock:
+            self._last[job_id] = event
+            self._last.move_to_end(job_id)
+            while len(self._last) > LAST_EVENT_JOBS:
+                self._last.popitem(last=False)
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, job_id, event)
+        except RuntimeError:
+            pass  # loop shutting down
+
+    def _deliver(self, job_id: str, event: Dict[str, Any]) -> None:
+        for q in self._subscribers.get(job_id, ()):
+            if q.full():
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            q.put_nowait(event)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Must be called on the attached event loop."""
+        q: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, []).append(q)
+        return q
+
+    def unsubscribe(self, job_id: str, q: asyncio.Queue) -> None:
+        subs = self._subscribers.get(job_id)
+        if not subs:
+            return
+        try:
+            subs.remove(q)
+        except ValueError:
+            pass
+        if not subs:
+            self._subscribers.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs_with_subscribers": len(self._subscribers),
+            "subscribers": sum(len(v) for v in self._subscribers.values()),
+        }
@@ -1,21 +1,51 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
+# rag.* imports are cheap: sentence_transformers/torch and cortex load on first use (or in the
+# lifespan warmup), so the API and /health come up without waiting for them
 try:
     from .rag.coach import run_rag_chat
 except Exception:
     run_rag_chat = None
 
+try:
+    from .rag.embedder import cache_stats as embed_cache_stats, backend_info as embed_backend_info
+    from .rag.batcher import embedding_batcher
+    from .rag.vectorai_client import payload_index, vector_client
+except Exception:
+    embed_cache_stats = None
+    embed_backend_info = None
+    embedding_batcher = None
+    payload_index = None
+    vector_client = None
+
+from .rag.warmup import ChatWarmup
 from .schemas import (
-    HealthResponse, UploadResponse, ScoreResult, MetricScore,
-    ChatRequest, ChatResponse, ChatCitation
+    HealthResponse, ReadyResponse, UploadResponse, ScoreResult, MetricScore,
+    ChatRequest, ChatResponse, ChatCitation, ChatStatsResponse,
+    RescoreRequest, RescoreResponse, RubricsResponse, AdminStatsResponse,
 )
-from .storage import create_job, save_upload, set_job_status, get_job
-
-import sys
+from .storage import (
+    create_job, set_job_status, get_job, find_done_job, get_job_score, count_job_scores,
+    stage_upload, commit_upload, discard_staged_upload, StagedUpload, UploadTooLarge, EmptyUpload,
+)
+from .cv.config import upload_content_key
+from .cv.rubrics import get_rubric, list_rubrics
+from .rescore import rescore_jobs, RESCORE_BATCH_SIZE
+from .worker_pool import CVWorkerPool, WorkerPoolFull, overlay_render_stale
+from .events import JobEventBroker
+from .result_cache import ResultCache, etag_for, etag_matches
+from . import databricks_sync
+from .databricks_sync import DatabricksSync
+
+import asyncio
+import hmac
+import json
 import os
-import subprocess
 
 try:
     from . import databricks_client
@@ -23,7 +53,52 @@ except Exception:
     databricks_client = None
 
 
-app = FastAPI(title="Running Coach API", version="0.1.0")
+# Shared secret for /admin/* (X-Admin-Token header); admin endpoints are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Seconds between keepalive comments on /results/{job_id}/events; the job store is also re-checked then
+SSE_HEARTBEAT_SEC = float(os.getenv("SSE_HEARTBEAT_SEC", "15"))
+
+job_events = JobEventBroker()
+result_cache = ResultCache()
+
+
+def _on_job_event(event: dict) -> None:
+    # Every stage transition follows a job store write: drop the job's cached /results bodies
+    if event.get("event") == "stage":
+        result_cache.invalidate(event["job_id"])
+    job_events.publish(event)
+
+
+cv_pool = CVWorkerPool(on_event=_on_job_event)
+db_sync = DatabricksSync()
+chat_warmup = ChatWarmup()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_events.attach_loop(asyncio.get_running_loop())
+    db_sync.start()
+    # Embedder load + test encode in the background; /ready turns 200 when it's done
+    chat_warmup.start()
+    await asyncio.to_thread(cv_pool.start)
+    try:
+        yield
+    finally:
+        # Graceful drain: queued/running CV jobs finish before the workers exit
+        await asyncio.to_thread(cv_pool.shutdown)
+        if embedding_batcher is not None:
+            await embedding_batcher.close()
+        if vector_client is not None:
+            await vector_client.close()
+        job_events.detach_loop()
+        # Last flush of the Databricks outbox; whatever is left is retried on next start
+        await asyncio.to_thread(db_sync.stop)
+        if databricks_client is not None:
+            databricks_client.close_pool()
+
+
+app = FastAPI(title="Running Coach API", version="0.1.0", lifespan=lifespan)
 
 # Dev-friendly CORS (lock down later)
 app.add_middleware(
@@ -60,192 +135,398 @@ def health():
     return {"ok": True}
 
 
+@app.get("/ready", response_model=ReadyResponse)
+def ready(response: Response):
+    """Readiness probe: 503 while the chat embedder is warming (200 once it is warm or has failed, or at once if warmup is disabled)."""
+    status = chat_warmup.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
 @app.post("/upload", response_model=UploadResponse)
 async def upload_video(file: UploadFile = File(...)):
     if not file.filename:
         raise HTTPException(status_code=400, detail="Missing filename")
 
-    content = await file.read()
-    if len(content) == 0:
-        raise HTTPException(status_code=400, detail="Empty file")
+    # Backpressure: reject before reading the body when the CV queue is already full
+    if cv_pool.is_full():
+        raise HTTPException(status_code=503, detail="Video analysis is busy, try again shortly",
+                            headers={"Retry-After": "30"})
 
-    # Create local job entry first (this is the source of truth for job_id)
-    job_id = create_job(filename="pending")
+    # Stream the upload to a temp file (bounded memory, hashed on the fly)
+    try:
+        staged = await stage_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except EmptyUpload:
+        raise HTTPException(status_code=400, detail="Empty file")
 
-    # Save video locally using the same job_id
-    save_name = f"{job_id}.mp4"
-    save_path = save_upload(content, save_name)
+    # Job store writes are blocking SQLite calls: keep them off the event loop
+    return await asyncio.to_thread(_register_upload, staged)
 
-    # Update local job with real filename/path
-    set_job_status(job_id, "queued", {"filename": save_path})
 
-    # Insert into Databricks SQL (metadata only; video stored locally)
+def _register_upload(staged: StagedUpload) -> dict:
+    """
+    Turn a staged upload into a queued job (or a cached hit on an earlier one). Runs on a worker
+    thread. Nothing is left behind on failure: the staged file is removed and a job row that was
+    already created is marked as an error, so /results doesn't wait on a job that never runs.
+    """
+    job_id = None
     try:
-        if databricks_client is not None:
-            q = (
-                "INSERT INTO uploads (job_id, created_at, video_path, status, overlay_path, rubric_version, error) "
-                f"VALUES ('{job_id}', current_timestamp(), '{save_path}', 'queued', NULL, NULL, NULL)"
-            )
-            databricks_client.execute_sql(q)
-    except Exception:
-        # If Databricks fails, continue with local storage only
-        pass
-
-    # Spawn local worker subprocess (files are always local now)
-    worker_py = os.path.join(os.path.dirname(__file__), "worker_local.py")
-    input_path = save_path
+        # Same clip + same analysis config already analyzed: reuse that job's scores and overlay
+        content_key = upload_content_key(staged.sha256)
+        cached_job = find_done_job(content_key)
+        overlay_status = cached_job.get("overlay_status") if cached_job else None
+        if overlay_render_stale(cached_job or {}):
+            overlay_status = "error"  # its worker is gone: the render never finishes
+        if cached_job and (
+            overlay_status in ("pending", "rendering")
+            or os.path.exists(cached_job.get("overlay_path") or "")
+            # A skipped/failed overlay is rendered again rather than served as final
+            or (overlay_status in ("skipped", "error") and cv_pool.rerender_overlay(cached_job))
+        ):
+            discard_staged_upload(staged.temp_path)
+            return {"job_id": cached_job["job_id"], "cached": True}
+
+        # Create local job entry first (this is the source of truth for job_id)
+        job_id = create_job(filename="pending", content_key=content_key)
+
+        # Move the staged video into place under the same job_id
+        save_name = f"{job_id}.mp4"
+        save_path = commit_upload(staged, save_name)
+
+        # Update local job with real filename/path
+        set_job_status(job_id, "queued", {"filename": save_path})
+    except BaseException as e:
+        discard_staged_upload(staged.temp_path)
+        if job_id is not None:
+            try:
+                set_job_status(job_id, "error", {"error": f"upload could not be stored: {e}"})
+            except Exception:
+                pass
+        raise
 
-    # Prefer dedicated CV worker venv to avoid protobuf conflicts with chat/cortex
-    cv_python = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", ".venv_cv", "Scripts", "python.exe")
-    )
-    python_cmd = cv_python if os.path.exists(cv_python) else sys.executable
+    # Databricks metadata row (video stored locally); written behind, never on the request path
+    databricks_sync.record_upload(job_id, save_path)
 
+    # Hand the job to the persistent CV worker pool
     try:
-        subprocess.Popen(
-            [python_cmd, worker_py, "--job_id", job_id, "--input_path", input_path],
-            cwd=os.path.dirname(__file__),
+        cv_pool.submit(job_id, save_path)
+    except WorkerPoolFull as e:
+        # Queue filled up while we were receiving the file: record the error locally and in Databricks
+        set_job_status(job_id, "error", {"error": str(e)})
+        result_cache.invalidate(job_id)
+        databricks_sync.record_upload_status(job_id, "error", str(e))
+        raise HTTPException(status_code=503, detail="Video analysis is busy, try again shortly",
+                            headers={"Retry-After": "30"})
+
+    return {"job_id": job_id, "cached": False}
+
+
+def _local_result(job_id: str, job: dict, subscores: dict | None = None) -> ScoreResult:
+    """
+    ScoreResult from a local job store entry. `subscores` (a stored job_scores row's) replace the
+    per-metric score estimates.
+    """
+    status = job.get("status", "queued")
+
+    if status == "error":
+        return ScoreResult(
+            job_id=job_id,
+            status="error",
+            error=job.get("error", "Unknown error"),
         )
-    except Exception:
-        # If spawn fails, write status error locally and to Databricks
-        set_job_status(job_id, "error", {"error": "worker spawn failed"})
+
+    if status != "done":
+        return ScoreResult(job_id=job_id, status=status)
+
+    # Local done state: build response from CV payload (top-level fields in the job payload)
+    overall_score = job.get("overall_score")
+    tips = job.get("tips", []) or []
+    overlay_path = job.get("overlay_path")
+    overlay_url = _to_static_url(overlay_path)
+    overlay_status = job.get("overlay_status") or ("done" if overlay_path else None)
+    metrics_payload = job.get("metrics", {}) or {}
+
+    # raw metric, display name, unit, the rubric subscore it drives
+    display_metric_map = [
+        ("cadence_spm_est", "Cadence", "spm", "cadence_proxy"),
+        ("overstride_ratio", "Overstride", "leg-lengths", "stride"),
+        ("avg_torso_lean_deg", "Torso Lean", "deg", "posture"),
+        ("vertical_oscillation_norm", "Vertical Bounce", "norm", "stability"),
+    ]
+
+    metrics = []
+    for raw_key, display_name, unit, subscore_key in display_metric_map:
+        raw_val = metrics_payload.get(raw_key)
+        if raw_val is None:
+            continue
         try:
-            if databricks_client is not None:
-                databricks_client.execute_sql(
-                    f"UPDATE uploads SET status='error', error='worker spawn failed' WHERE job_id='{job_id}'"
-                )
+            value = float(raw_val)
         except Exception:
-            pass
+            continue
+
+        # Demo-friendly score guesses when local payload only has raw values
+        score_guess = 75
+        if raw_key == "cadence_spm_est":
+            score_guess = 85 if 160 <= value <= 185 else 60
+        elif raw_key == "avg_torso_lean_deg":
+            score_guess = 85 if 5 <= value <= 15 else 65
+        elif raw_key == "overstride_ratio":
+            score_guess = 85 if value <= 1.2 else 60
+        elif raw_key == "vertical_oscillation_norm":
+            score_guess = 85 if value <= 0.02 else 65
+        if subscores and subscore_key in subscores:
+            score_guess = subscores[subscore_key]
+
+        metrics.append(
+            MetricScore(
+                name=display_name,
+                score=int(score_guess),
+                value=value,
+                unit=unit,
+            )
+        )
 
-    return {"job_id": job_id}
+    return ScoreResult(
+        job_id=job_id,
+        status="done",
+        overall_score=int(overall_score) if overall_score is not None else None,
+        metrics=metrics,
+        tips=tips,
+        overlay_path=overlay_url,
+        overlay_status=overlay_status,
+        rubric_version=job.get("rubric_version"),
+    )
 
 
-@app.get("/results/{job_id}", response_model=ScoreResult)
-def results(job_id: str):
-    # 1) Prefer local jobs.json first (best for CV demo reliability)
-    job = get_job(job_id)
-    if job:
-        status = job.get("status", "queued")
+def _is_terminal(result: ScoreResult) -> bool:
+    if result.status == "error":
+        return True
+    return result.status == "done" and result.overlay_status not in ("pending", "rendering")
 
-        if status == "error":
-            return ScoreResult(
-                job_id=job_id,
-                status="error",
-                error=job.get("error", "Unknown error"),
-            )
 
-        if status != "done":
-            return ScoreResult(job_id=job_id, status=status)
-
-        # Local done state: build response from CV payload (top-level fields in jobs.json)
-        overall_score = job.get("overall_score")
-        tips = job.get("tips", []) or []
-        overlay_path = job.get("overlay_path")
-        overlay_url = _to_static_url(overlay_path)
-        metrics_payload = job.get("metrics", {}) or {}
-
-        display_metric_map = [
-            ("cadence_spm_est", "Cadence", "spm"),
-            ("overstride_ratio", "Overstride", "leg-lengths"),
-            ("avg_torso_lean_deg", "Torso Lean", "deg"),
-            ("vertical_oscillation_norm", "Vertical Bounce", "norm"),
-        ]
-
-        metrics = []
-        for raw_key, display_name, unit in display_metric_map:
-            raw_val = metrics_payload.get(raw_key)
-            if raw_val is None:
-                continue
-            try:
-                value = float(raw_val)
-            except Exception:
-                continue
-
-            # Demo-friendly score guesses when local payload only has raw values
-            score_guess = 75
-            if raw_key == "cadence_spm_est":
-                score_guess = 85 if 160 <= value <= 185 else 60
-            elif raw_key == "avg_torso_lean_deg":
-                score_guess = 85 if 5 <= value <= 15 else 65
-            elif raw_key == "overstride_ratio":
-                score_guess = 85 if value <= 1.2 else 60
-            elif raw_key == "vertical_oscillation_norm":
-                score_guess = 85 if value <= 0.02 else 65
-
-            metrics.append(
-                MetricScore(
-                    name=display_name,
-                    score=int(score_guess),
-                    value=value,
-                    unit=unit,
+def _databricks_result(job_id: str) -> ScoreResult | None:
+    """ScoreResult from the Databricks tables (one joined lookup), or None if the job isn't there."""
+    row = databricks_client.fetch_one(
+        "SELECT u.status, u.overlay_path, u.error, r.job_id, r.overall_score, r.metrics, r.tips "
+        "FROM uploads u LEFT JOIN video_results r ON r.job_id = u.job_id "
+        "WHERE u.job_id = ?",
+        (job_id,),
+    )
+    if not row:
+        return None
+    status, overlay_path, error, result_job_id, overall_score, metrics_map, tips_arr = row
+    if status == "error":
+        return ScoreResult(job_id=job_id, status="error", error=error)
+    if status != "done":
+        return ScoreResult(job_id=job_id, status=status)
+    if result_job_id is None:
+        return ScoreResult(job_id=job_id, status="processing")
+
+    metrics_out = []
+    try:
+        if metrics_map:
+            for k, v in metrics_map.items():
+                metrics_out.append(
+                    MetricScore(
+                        name=k,
+                        score=int(v.get("score", 0)),
+                        value=float(v.get("mean", 0)),
+                    )
                 )
-            )
+    except Exception:
+        metrics_out = []
+
+    tips = list(tips_arr) if tips_arr else []
+    overlay_url = _to_static_url(overlay_path)
+    return ScoreResult(
+        job_id=job_id,
+        status="done",
+        overall_score=overall_score,
+        metrics=metrics_out,
+        tips=tips,
+        overlay_path=overlay_url,
+    )
 
-        return ScoreResult(
-            job_id=job_id,
-            status="done",
-            overall_score=int(overall_score) if overall_score is not None else None,
-            metrics=metrics,
-            tips=tips,
-            overlay_path=overlay_url,
-        )
+
+def _build_result(job_id: str, rubric_version: str | None) -> tuple[ScoreResult, bool]:
+    """(result, from the local job store). Databricks fallback results are never invalidated by a
+    local stage event, so the caller must not cache them."""
+    # 1) Prefer local job store first (best for CV demo reliability)
+    job = get_job(job_id)
+    if job:
+        # Scores under another (re-scored) rubric version, if stored
+        if rubric_version and job.get("status") == "done" and rubric_version != job.get("rubric_version"):
+            stored = get_job_score(job_id, rubric_version)
+            if stored is None:
+                raise HTTPException(status_code=404, detail=f"No scores for rubric {rubric_version}")
+            result = _local_result(job_id, job, subscores=stored["subscores"])
+            result.overall_score = stored["score"]
+            result.tips = stored["tips"]
+            result.rubric_version = rubric_version
+            return result, True
+        return _local_result(job_id, job), True
 
     # 2) If not in local storage, try Databricks (fallback)
     try:
         if databricks_client is not None:
-            row = databricks_client.fetch_one(
-                f"SELECT status, overlay_path, error FROM uploads WHERE job_id='{job_id}'"
-            )
-            if row:
-                status, overlay_path, error = row[0], row[1], row[2]
-                if status == "error":
-                    return ScoreResult(job_id=job_id, status="error", error=error)
-                if status != "done":
-                    return ScoreResult(job_id=job_id, status=status)
-
-                res = databricks_client.fetch_one(
-                    f"SELECT overall_score, metrics, tips FROM video_results WHERE job_id='{job_id}'"
-                )
-                if not res:
-                    return ScoreResult(job_id=job_id, status="processing")
-
-                overall_score, metrics_map, tips_arr = res[0], res[1], res[2]
-
-                metrics_out = []
-                try:
-                    if metrics_map:
-                        for k, v in metrics_map.items():
-                            metrics_out.append(
-                                MetricScore(
-                                    name=k,
-                                    score=int(v.get("score", 0)),
-                                    value=float(v.get("mean", 0)),
-                                )
-                            )
-                except Exception:
-                    metrics_out = []
-
-                tips = list(tips_arr) if tips_arr else []
-                overlay_url = _to_static_url(overlay_path)
-                return ScoreResult(
-                    job_id=job_id,
-                    status="done",
-                    overall_score=overall_score,
-                    metrics=metrics_out,
-                    tips=tips,
-                    overlay_path=overlay_url,
-                )
+            result = _databricks_result(job_id)
+            if result is not None:
+                return result, False
     except Exception:
         pass
 
     raise HTTPException(status_code=404, detail="job_id not found")
 
 
+@app.get("/results/{job_id}", response_model=ScoreResult)
+def results(job_id: str, rubric_version: str | None = None, if_none_match: str | None = Header(default=None)):
+    """
+    Job status/result. Terminal local results are serialized once and served from result_cache
+    (invalidated on every stage transition); every response carries an ETag, and a matching
+    If-None-Match gets an empty 304.
+    """
+    cached = result_cache.get(job_id, rubric_version)
+    if cached is not None:
+        body, etag = cached
+    else:
+        result, local = _build_result(job_id, rubric_version)
+        body = result.model_dump_json().encode()
+        etag = etag_for(body)
+        if local and _is_terminal(result):
+            result_cache.put(job_id, rubric_version, body, etag)
+
+    # no-cache: clients may store the body but must revalidate (cheap 304) before reusing it
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/results/{job_id}/events")
+async def result_events(job_id: str, request: Request):
+    """
+    Server-sent events for one job, replacing client-side polling of /results/{job_id}:
+      event: status    full ScoreResult, sent first and again after every stage transition
+      event: stage     {"stage": "processing" | "scoring" | "done" | "overlay_rendering" | ...}
+      event: progress  {"stage", "frames_done", "frames_total"[, "metrics"]} (interim raw metrics)
+    The stream closes once the job is terminal (error, or done with the overlay settled).
+    """
+    if get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="job_id not found")
+
+    async def stream():
+        # Subscribe before the first snapshot so no transition falls between the two
+        q = job_events.subscribe(job_id)
+        try:
+            snapshot = _local_result(job_id, get_job(job_id) or {})
+            yield _sse("status", snapshot.model_dump())
+            if _is_terminal(snapshot):
+                return
+
+            last = job_events.last_event(job_id)
+            if last and last.get("event") == "progress":
+                yield _sse("progress", last)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=SSE_HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Catch changes made outside the pool (e.g. worker_local.py run by hand)
+                    fresh = _local_result(job_id, get_job(job_id) or {})
+                    if fresh != snapshot:
+                        snapshot = fresh
+                        yield _sse("status", snapshot.model_dump())
+                        if _is_terminal(snapshot):
+                            return
+                    yield ": keepalive\n\n"
+                    continue
+
+                kind = event.get("event", "progress")
+                yield _sse(kind, event)
+                if kind == "stage":
+                    snapshot = _local_result(job_id, get_job(job_id) or {})
+                    yield _sse("status", snapshot.model_dump())
+                    if _is_terminal(snapshot):
+                        return
+        finally:
+            job_events.unsubscribe(job_id, q)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _require_admin(token: str | None) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/admin/rubrics", response_model=RubricsResponse)
+def admin_rubrics(x_admin_token: str | None = Header(default=None)):
+    _require_admin(x_admin_token)
+    return RubricsResponse(active=get_rubric().version, versions=list_rubrics(), scored=count_job_scores())
+
+
+@app.post("/admin/rescore", response_model=RescoreResponse)
+async def admin_rescore(req: RescoreRequest, x_admin_token: str | None = Header(default=None)):
+    """Re-score all stored raw metrics with one rubric version (no CV re-run); reports throughput."""
+    _require_admin(x_admin_token)
+    try:
+        get_rubric(req.rubric_version)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    stats = await asyncio.to_thread(rescore_jobs, req.rubric_version, req.batch_size or RESCORE_BATCH_SIZE)
+    # Stored scores for that rubric version changed under any cached ?rubric_version= bodies
+    result_cache.clear()
+    return RescoreResponse(**stats)
+
+
+@app.get("/admin/stats", response_model=AdminStatsResponse)
+def admin_stats(x_admin_token: str | None = Header(default=None)):
+    _require_admin(x_admin_token)
+    return AdminStatsResponse(
+        result_cache=result_cache.stats(),
+        cv_pool=cv_pool.stats(),
+        databricks_sync=db_sync.stats(),
+    )
+
+
+@app.get("/chat/stats", response_model=ChatStatsResponse)
+def chat_stats():
+    return ChatStatsResponse(
+        embed_cache=embed_cache_stats() if embed_cache_stats is not None else {},
+        embed_batcher=embedding_batcher.stats() if embedding_batcher is not None else {},
+        embed_backend=embed_backend_info() if embed_backend_info is not None else {},
+        payload_index=payload_index.stats() if payload_index is not None else {},
+        vector_client=vector_client.stats() if vector_client is not None else {},
+    )
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
-    if run_rag_chat is None:
+    if run_rag_chat is None or chat_warmup.state == "unavailable":
         raise HTTPException(status_code=503, detail="Chat feature temporarily unavailable in this environment")
-    result = await run_rag_chat(req.message)
+    try:
+        result = await run_rag_chat(req.message)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Exercise search timed out, try again shortly")
+    except ConnectionError:
+        # rag.vectorai_client.VectorSearchUnavailable: still unreachable after one reconnect
+        raise HTTPException(status_code=503, detail="Exercise search is unavailable, try again shortly",
+                            headers={"Retry-After": "5"})
     cites = [
         ChatCitation(title=c.get("title", "Source"), note=c.get("note", ""))
         for c in result.get("citations", [])
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import EMBED_BATCH_MAX, EMBED_BATCH_WAIT_MS
+from .embedder import cached_embedding, embed_texts
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent /chat embedding requests into batched encodes.
+    Callers await embed(text); one collector task per event loop drains the queue, waits up to
+    `wait_ms` for a batch of `max_batch`, and runs a single `embed_many` call on a worker thread.
+    Only one encode runs at a time, so requests that arrive meanwhile form the next batch instead
+    of competing for the GIL and the torch thread pool. In-memory cache hits never queue
+    (`lookup` runs on the event loop, so it must not block).
+    """
+
+    def __init__(
+        self,
+        embed_many: Callable[[List[str]], List[List[float]]] = embed_texts,
+        lookup: Optional[Callable[[str], Optional[List[float]]]] = cached_embedding,
+        max_batch: int = EMBED_BATCH_MAX,
+        wait_ms: float = EMBED_BATCH_WAIT_MS,
+    ):
+        self.embed_many = embed_many
+        self.lookup = lookup
+        self.max_batch = max(1, max_batch)
+        self.wait = max(0.0, wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        self._requests = 0
+        self._cache_hits = 0
+        self._batches = 0
+        self._batched_items = 0
+        self._max_batch_seen = 0
+        self._encode_sec = 0.0
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._collect())
+        return self._queue
+
+    async def embed(self, text: str) -> List[float]:
+        self._requests += 1
+        if self.lookup is not None:
+            vec = self.lookup(text)
+            if vec is not None:
+                self._cache_hits += 1
+                return vec
+        queue = self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        queue.put_nowait((text, fut))
+        return await fut
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.wait
+        while len(batch) < self.max_batch:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _collect(self) -> None:
+        queue = self._queue
+        while True:
+            batch = await self._next_batch(queue)
+            # Callers that gave up (cancelled /chat) don't need an embedding
+            batch = [(text, fut) for text, fut in batch if not fut.done()]
+            if not batch:
+                continue
+
+            self._in_flight = len(batch)
+            t0 = time.perf_counter()
+            try:
+                vecs = await asyncio.to_thread(self.embed_many, [text for text, _ in batch])
+            except asyncio.CancelledError:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.cancel()
+                raise
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for (_, fut), vec in zip(batch, vecs):
+                    if not fut.done():
+                        fut.set_result(vec)
+            finally:
+                self._in_flight = 0
+
+            self._encode_sec += time.perf_counter() - t0
+            self._batches += 1
+            self._batched_items += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+
+    async def close(self) -> None:
+        """Stop the collector (on the loop that owns it); queued callers are cancelled."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            _, fut = queue.get_nowait()
+            if not fut.done():
+                fut.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "requests": self._requests,
+            "cache_hits": self._cache_hits,
+            "batches": self._batches,
+            "avg_batch_size": round(self._batched_items / self._batches, 2) if self._batches else 0.0,
+            "max_batch_size": self._max_batch_seen,
+            "avg_encode_ms": round(1000 * self._encode_sec / self._batches, 2) if self._batches else 0.0,
+            "max_batch": self.max_batch,
+            "wait_ms": self.wait * 1000,
+        }
+
+
+# Process-wide batcher used by rag.coach
+embedding_batcher = EmbeddingBatcher()
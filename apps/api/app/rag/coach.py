@@ -1,9 +1,8 @@
-import asyncio
 from typing import Any, Dict, List, Optional, Tuple
 
 from .config import RAG_TOP_K
-from .embedder import embed_text
-from .vectorai_client import search_vectors
+from .batcher import embedding_batcher
+from .vectorai_client import vector_client
 
 
 BODY_PARTS = {
@@ -123,20 +122,19 @@ async def run_rag_chat(message: str) -> Dict[str, Any]:
 
     goal_filter = intent if intent in {"warmup", "stretch", "mobility", "strength"} else None
 
-    query_vec = await asyncio.to_thread(embed_text, message)
+    # Batched with concurrent /chat requests (cache hits return immediately)
+    query_vec = await embedding_batcher.embed(message)
 
     # If no body area recognized, search broadly (no body filter)
     if body_area is None:
-        docs = await asyncio.to_thread(
-            search_vectors,
+        docs = await vector_client.search(
             query_vec,
             None,
             goal_filter,
             RAG_TOP_K,
         )
     else:
-        docs = await asyncio.to_thread(
-            search_vectors,
+        docs = await vector_client.search(
             query_vec,
             body_area,
             goal_filter,
@@ -145,8 +143,7 @@ async def run_rag_chat(message: str) -> Dict[str, Any]:
 
         # Retry without intent filter if too restrictive
         if not docs and goal_filter is not None:
-            docs = await asyncio.to_thread(
-                search_vectors,
+            docs = await vector_client.search(
                 query_vec,
                 body_area,
                 None,
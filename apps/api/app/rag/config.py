@@ -10,3 +10,41 @@ RAG_MIN_SCORE = float(os.getenv("RAG_MIN_SCORE", "0.2"))
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# Query embedding cache (see embed_cache.py): in-memory LRU entries, 0 disables
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+# Optional persistent tier (float16 vectors in an mmap file); empty = memory only
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "").strip()
+EMBED_CACHE_DISK_ROWS = int(os.getenv("EMBED_CACHE_DISK_ROWS", "100000"))
+# Lowercase queries before caching/embedding (exact for uncased models like the default MiniLM)
+EMBED_CACHE_CASEFOLD = os.getenv("EMBED_CACHE_CASEFOLD", "1") == "1"
+
+# /chat embedding micro-batching (see batcher.py): max queries per encode, and how long the first
+# query of a batch waits for company (requests arriving during an encode always join the next batch)
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "2"))
+
+# Load and test-run the embedder in the background at API startup (/ready reports when done);
+# 0 = load on the first /chat request instead
+CHAT_WARMUP = os.getenv("CHAT_WARMUP", "1") == "1"
+
+# Query embedding backend: "torch" (sentence-transformers), "onnx" (int8-quantized ONNX export run on
+# onnxruntime; falls back to torch if export or the parity check fails), or "auto" (onnx when
+# onnxruntime is installed, else torch). See onnx_backend.py.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").strip().lower()
+# Exported/quantized models are cached here, one directory per EMBEDDING_MODEL
+ONNX_CACHE_DIR = os.getenv(
+    "ONNX_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "storage", "onnx")
+)
+# Minimum cosine similarity between ONNX and torch vectors (over fixed sample queries) to use ONNX
+ONNX_PARITY_MIN = float(os.getenv("ONNX_PARITY_MIN", "0.99"))
+# onnxruntime intra-op threads; 0 = runtime default
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+# Seconds between checks of data/exercises/exercises.json for changes (see vectorai_client.PayloadIndex)
+PAYLOAD_RELOAD_CHECK_SEC = float(os.getenv("PAYLOAD_RELOAD_CHECK_SEC", "2"))
+
+# Shared VectorAI connection (see vectorai_client.AsyncVectorAIClient): concurrent searches and
+# per-search deadline
+VECTORAI_MAX_CONCURRENCY = int(os.getenv("VECTORAI_MAX_CONCURRENCY", "8"))
+VECTORAI_TIMEOUT_SEC = float(os.getenv("VECTORAI_TIMEOUT_SEC", "5"))
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str, casefold: bool = True) -> str:
+    """Cache key (and the text actually embedded): whitespace collapsed, optionally lowercased."""
+    key = " ".join(text.split())
+    return key.lower() if casefold else key
+
+
+class _DiskTier:
+    """
+    Persistent float16 vectors in a preallocated mmap file (`capacity` rows) plus an append-only
+    key log; row i of vectors.f16 belongs to line i of keys.jsonl. A vector is written (and
+    flushed) before its key line, so a crash never leaves a key pointing at a missing vector.
+    Stops accepting new rows once full.
+    """
+
+    def __init__(self, directory: str, model: str, dim: int, capacity: int):
+        self.directory = directory
+        self.dim = dim
+        self.capacity = max(1, capacity)
+        self.rows: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+        meta = {"model": model, "dim": dim, "capacity": self.capacity, "dtype": "float16"}
+        meta_path = os.path.join(directory, "meta.json")
+        vec_path = os.path.join(directory, "vectors.f16")
+        self._keys_path = os.path.join(directory, "keys.jsonl")
+
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                same = json.load(f) == meta
+        except Exception:
+            same = False
+        if not same:
+            # Different model/dim/capacity (or first use): start over
+            for p in (vec_path, self._keys_path):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        size = self.capacity * dim * 2
+        with open(vec_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)  # sparse on most filesystems
+        self._vectors = np.memmap(vec_path, dtype=np.float16, mode="r+", shape=(self.capacity, dim))
+
+        good = 0
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n") or len(self.rows) >= self.capacity:
+                        break
+                    try:
+                        key = json.loads(line)
+                    except Exception:
+                        break
+                    if key in self.rows:
+                        break
+                    self.rows[key] = len(self.rows)
+                    good += len(line)
+            # Rows are positional: drop a torn tail (crash mid-append) so new lines stay aligned
+            with open(self._keys_path, "ab") as f:
+                f.truncate(good)
+        self._next = len(self.rows)
+        self._keys = open(self._keys_path, "a", encoding="utf-8")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return np.asarray(self._vectors[row], dtype=np.float32)
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        if key in self.rows or self._next >= self.capacity:
+            return
+        row = self._next
+        self._vectors[row] = vec.astype(np.float16)
+        self._vectors.flush()
+        self._keys.write(json.dumps(key) + "\n")
+        self._keys.flush()
+        self.rows[key] = row
+        self._next += 1
+
+    def close(self) -> None:
+        try:
+            self._keys.close()
+        except Exception:
+            pass
+
+
+class EmbeddingCache:
+    """
+    Two-level query embedding cache: an in-memory LRU of float32 vectors, backed (when `directory`
+    is set) by a persistent float16 mmap tier shared across restarts. Disk hits are promoted into
+    memory. Thread-safe; embed_text runs on worker threads. The disk tier is keyed by `model`
+    and stays closed until one is set (see bind_model).
+    """
+
+    def __init__(self, max_size: int, directory: str = "", disk_rows: int = 100000, model: str = ""):
+        self.max_size = max_size
+        self.directory = directory
+        self.disk_rows = disk_rows
+        self.model = model
+        self._mem: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk: Optional[_DiskTier] = None
+        self._disk_failed = False
+        self._lock = threading.Lock()
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        if self.max_size <= 0:
+            return
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_size:
+            self._mem.popitem(last=False)
+
+    def bind_model(self, model: str) -> None:
+        """Name the source of the vectors (e.g. model@backend) once known; the disk tier waits for it."""
+        with self._lock:
+            if model != self.model and self._disk is not None:
+                self._disk.close()
+                self._disk = None
+            self.model = model
+
+    def _open_disk(self, dim: int) -> Optional[_DiskTier]:
+        if self._disk is None and self.directory and not self._disk_failed:
+            try:
+                self._disk = _DiskTier(self.directory, self.model, dim, self.disk_rows)
+            except Exception:
+                self._disk_failed = True  # unwritable dir etc.: memory tier only
+        return self._disk
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self._hits_memory += 1
+                return vec
+            # The disk tier is opened on first put (its dim comes from the model), or here if one exists
+            disk = self._disk
+            if disk is None and self.directory and self.model:
+                dim = self._stored_dim()
+                disk = self._open_disk(dim) if dim else None
+            vec = disk.get(key) if disk is not None else None
+            if vec is not None:
+                self._remember(key, vec)
+                self._hits_disk += 1
+                return vec
+            self._misses += 1
+            return None
+
+    def peek(self, key: str) -> Optional[np.ndarray]:
+        """
+        Memory-tier lookup that never blocks or does I/O (safe on the event loop): None on a memory
+        miss or when the lock is busy. Only hits are counted; the caller's fallback get() counts the miss.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self._hits_memory += 1
+            return vec
+        finally:
+            self._lock.release()
+
+    def _stored_dim(self) -> int:
+        try:
+            with open(os.path.join(self.directory, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("model") == self.model:
+                return int(meta["dim"])
+        except Exception:
+            pass
+        return 0
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vec)
+            disk = self._open_disk(vec.shape[0]) if self.directory and self.model else None
+            if disk is not None and disk.dim == vec.shape[0]:
+                try:
+                    disk.put(key, vec)
+                except Exception:
+                    pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._mem),
+                "max_size": self.max_size,
+                "disk_rows": len(self._disk.rows) if self._disk is not None else 0,
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+            }
@@ -1,16 +1,125 @@
-from functools import lru_cache
-from sentence_transformers import SentenceTransformer
+from __future__ import annotations
 
-from .config import EMBEDDING_MODEL
+import importlib.util
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .config import (
+    EMBEDDING_MODEL, EMBEDDING_BACKEND,
+    EMBED_CACHE_SIZE, EMBED_CACHE_DIR, EMBED_CACHE_DISK_ROWS, EMBED_CACHE_CASEFOLD,
+)
+from .embed_cache import EmbeddingCache, normalize_query
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Backends produce slightly different vectors: get_encoder() binds the persisted cache to the backend
+# it actually picked ("auto" or a rejected ONNX export may end up on torch)
+_cache = EmbeddingCache(EMBED_CACHE_SIZE, EMBED_CACHE_DIR, EMBED_CACHE_DISK_ROWS)
+# Which backend get_encoder() picked, and why ONNX was rejected (if it was)
+_backend: dict = {"requested": EMBEDDING_BACKEND, "backend": None, "error": None}
+
+# Serializes model/encoder loading: the lifespan warmup thread and the first /chat requests can
+# all get here at once, and each would otherwise load its own copy. Reentrant because the ONNX
+# export in get_encoder() loads the torch model through get_model().
+_load_lock = threading.RLock()
+_model: SentenceTransformer | None = None
+_encoder = None
 
-@lru_cache(maxsize=1)
 def get_model() -> SentenceTransformer:
-    return SentenceTransformer(EMBEDDING_MODEL)
+    global _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                # Imported here: sentence_transformers pulls in torch, which dominates API import time
+                from sentence_transformers import SentenceTransformer
+
+                _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+class _TorchEncoder:
+    def __init__(self, model: SentenceTransformer):
+        self.model = model
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, batch_size=max(32, len(texts)))
+
+def get_encoder():
+    """
+    Query encoder (.encode(texts) -> L2-normalized vectors) for EMBEDDING_BACKEND, built once.
+    ONNX is used only if its export passed the parity check; otherwise this falls back to torch.
+    get_model() stays the torch model (document ingestion uses it directly).
+    """
+    global _encoder
+    if _encoder is None:
+        with _load_lock:
+            if _encoder is None:
+                encoder = _load_encoder()
+                _cache.bind_model(f"{EMBEDDING_MODEL}@{_backend['backend']}")
+                _encoder = encoder
+    return _encoder
+
+def _load_encoder():
+    want_onnx = EMBEDDING_BACKEND == "onnx" or (
+        EMBEDDING_BACKEND == "auto" and importlib.util.find_spec("onnxruntime") is not None
+    )
+    if want_onnx:
+        try:
+            from .onnx_backend import load_onnx_encoder
+
+            encoder = load_onnx_encoder(get_model)
+            _backend.update(backend="onnx", parity_min_cosine=encoder.parity_min_cosine)
+            return encoder
+        except Exception as e:
+            _backend["error"] = str(e)
+    _backend["backend"] = "torch"
+    return _TorchEncoder(get_model())
 
 def embed_text(text: str) -> list[float]:
-    model = get_model()
-    vec = model.encode([text], normalize_embeddings=True)[0]
+    # Repeated questions skip the transformer: the normalized query is both cache key and model input
+    key = normalize_query(text, EMBED_CACHE_CASEFOLD)
+    encoder = get_encoder()  # first: binds the disk cache tier to the resolved backend
+    vec = _cache.get(key)
+    if vec is None:
+        vec = encoder.encode([key])[0]
+        _cache.put(key, vec)
     return vec.tolist()
 
+def cached_embedding(text: str) -> list[float] | None:
+    """
+    Vector for `text` from the in-memory cache tier only (no model, disk or lock wait, so it may run
+    on the event loop); None otherwise. embed_texts then checks the disk tier and counts the miss.
+    """
+    vec = _cache.peek(normalize_query(text, EMBED_CACHE_CASEFOLD))
+    return vec.tolist() if vec is not None else None
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """embed_text for many queries: cache hits are reused, all misses go through one batched encode."""
+    keys = [normalize_query(t, EMBED_CACHE_CASEFOLD) for t in texts]
+    encoder = get_encoder()  # first: binds the disk cache tier to the resolved backend
+    found = {}
+    for key in keys:
+        if key not in found:
+            found[key] = _cache.get(key)
+    missing = [key for key, vec in found.items() if vec is None]
+    if missing:
+        vecs = encoder.encode(missing)
+        for key, vec in zip(missing, vecs):
+            _cache.put(key, vec)
+            found[key] = vec
+    return [found[key].tolist() for key in keys]
+
 def embedding_dim() -> int:
     return get_model().get_sentence_embedding_dimension()
+
+def warmup() -> None:
+    """Load the encoder (exporting ONNX if needed) and run one encode, without touching the cache."""
+    get_encoder().encode(["my left shin hurts after running"])
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+def backend_info() -> dict:
+    return dict(_backend)
@@ -0,0 +1,196 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from .config import EMBEDDING_MODEL, ONNX_CACHE_DIR, ONNX_PARITY_MIN, ONNX_THREADS
+
+# Queries the int8 export must reproduce (cosine vs. torch) before it may serve /chat
+PARITY_QUERIES = (
+    "my left shin hurts after running",
+    "what should I do for a warm-up before a run?",
+    "outer hip pain on long runs",
+    "achilles is tight in the morning",
+    "stretches for sore calves after a race",
+    "how can I strengthen my knees for running",
+    "plantar fasciitis arch pain",
+    "lower back pain when running downhill",
+    "hamstring feels tight",
+    "best mobility routine for ankles",
+)
+
+_MODEL_FILE = "model.int8.onnx"
+_META_FILE = "meta.json"
+_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def _model_dir(model_name: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_")[-60:]
+    digest = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(ONNX_CACHE_DIR, f"{slug}-{digest}")
+
+
+class OnnxEncoder:
+    """
+    Fast tokenizer + int8 ONNX transformer + mean pooling + L2 norm (sentence-transformers' pipeline
+    for MiniLM). Needs only `tokenizers` and onnxruntime at runtime, not torch/transformers.
+    """
+
+    def __init__(self, session, tokenizer, input_names: List[str]):
+        self.session = session
+        self.tokenizer = tokenizer  # tokenizers.Tokenizer with padding + truncation enabled
+        self.input_names = input_names
+        self.parity_min_cosine: float | None = None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encs = self.tokenizer.encode_batch(list(texts))
+        arrays = {
+            "input_ids": np.array([e.ids for e in encs], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encs], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encs], dtype=np.int64),
+        }
+        feeds = {name: arrays[name] for name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        mask = arrays["attention_mask"][..., None].astype(np.float32)
+        vecs = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return (vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)).astype(np.float32)
+
+
+def _session(path: str):
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_THREADS > 0:
+        opts.intra_op_num_threads = ONNX_THREADS
+    return ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+
+
+def _is_mean_pooling(pooling) -> bool:
+    try:
+        cfg = pooling.get_config_dict()
+    except Exception:
+        return False
+    if "pooling_mode" in cfg:  # sentence-transformers >= 6
+        return cfg["pooling_mode"] == "mean"
+    modes = {k for k, v in cfg.items() if k.startswith("pooling_mode_") and v}
+    return modes == {"pooling_mode_mean_tokens"}
+
+
+def _export(st_model, out_dir: str) -> Dict[str, Any]:
+    """Export the sentence-transformers model's transformer to ONNX and quantize it (int8 dynamic)."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    modules = list(st_model)
+    transformer = modules[0]
+    pooling = modules[1] if len(modules) > 1 else None
+    if pooling is None or not _is_mean_pooling(pooling):
+        raise RuntimeError("only mean-pooling sentence-transformers models can be exported")
+
+    tokenizer = st_model.tokenizer
+    if not getattr(tokenizer, "is_fast", False):
+        raise RuntimeError("ONNX backend needs a fast (tokenizers) tokenizer")
+    max_length = int(getattr(st_model, "max_seq_length", None) or 256)
+    sample = tokenizer(["warm up"], return_tensors="pt")
+    input_names = [name for name in _INPUTS if name in sample]
+
+    class _Hidden(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(input_names, args)))[0]
+
+    os.makedirs(out_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = os.path.join(tmp, "model.onnx")
+        kwargs: Dict[str, Any] = {}
+        # Newer torch defaults to the dynamo exporter (needs onnxscript); the TorchScript one is enough here
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            kwargs["dynamo"] = False
+        with torch.no_grad():
+            torch.onnx.export(
+                _Hidden(transformer.auto_model.eval()),
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    **{name: {0: "batch", 1: "seq"} for name in input_names},
+                    "last_hidden_state": {0: "batch", 1: "seq"},
+                },
+                opset_version=14,
+                **kwargs,
+            )
+        quantize_dynamic(fp32_path, os.path.join(out_dir, _MODEL_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(out_dir)
+    return {
+        "input_names": input_names,
+        "max_length": max_length,
+        "pad_id": tokenizer.pad_token_id or 0,
+        "pad_token": tokenizer.pad_token or "[PAD]",
+    }
+
+
+def _open(out_dir: str, meta: Dict[str, Any]) -> OnnxEncoder:
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(os.path.join(out_dir, "tokenizer.json"))
+    tokenizer.enable_truncation(meta["max_length"])
+    tokenizer.enable_padding(pad_id=meta["pad_id"], pad_token=meta["pad_token"])
+    return OnnxEncoder(_session(os.path.join(out_dir, _MODEL_FILE)), tokenizer, meta["input_names"])
+
+
+def load_onnx_encoder(get_torch_model: Callable[[], Any], model_name: str = EMBEDDING_MODEL) -> OnnxEncoder:
+    """
+    int8 ONNX encoder for `model_name`, exported (and parity-checked against `get_torch_model()`)
+    on first use and cached under ONNX_CACHE_DIR; later starts load it without torch.
+    Raises RuntimeError when the export's parity cosine is below ONNX_PARITY_MIN.
+    """
+    out_dir = _model_dir(model_name)
+    meta_path = os.path.join(out_dir, _META_FILE)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != model_name:
+            meta = None
+    except Exception:
+        meta = None
+
+    if meta is None:
+        st_model = get_torch_model()
+        t0 = time.perf_counter()
+        # Export into a scratch dir that is renamed into place complete (meta.json written last),
+        # so a concurrent or later reader never sees a half-written model directory
+        os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=ONNX_CACHE_DIR)
+        try:
+            meta = {"model": model_name, **_export(st_model, tmp_dir)}
+            ref = np.asarray(st_model.encode(list(PARITY_QUERIES), normalize_embeddings=True), dtype=np.float32)
+            got = _open(tmp_dir, meta).encode(list(PARITY_QUERIES))
+            meta["parity_min_cosine"] = float((ref * got).sum(axis=1).min())
+            meta["export_sec"] = round(time.perf_counter() - t0, 2)
+            with open(os.path.join(tmp_dir, _META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            shutil.rmtree(out_dir, ignore_errors=True)
+            os.replace(tmp_dir, out_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # The stored cosine is re-checked against the current threshold, so tightening it takes effect
+    if meta["parity_min_cosine"] < ONNX_PARITY_MIN:
+        raise RuntimeError(
+            f"ONNX parity check failed: min cosine {meta['parity_min_cosine']:.4f} < {ONNX_PARITY_MIN}"
+        )
+    encoder = _open(out_dir, meta)
+    encoder.parity_min_cosine = meta["parity_min_cosine"]
+    return encoder
@@ -1,14 +1,25 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import functools
+import hashlib
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from cortex import CortexClient
-from cortex.filters import Filter, Field
+from .config import (
+    VECTORAI_ADDRESS, VECTORAI_COLLECTION, PAYLOAD_RELOAD_CHECK_SEC,
+    VECTORAI_MAX_CONCURRENCY, VECTORAI_TIMEOUT_SEC,
+)
 
-from .config import VECTORAI_ADDRESS, VECTORAI_COLLECTION
+# apps/api/app/rag/vectorai_client.py -> repo root is parents[4]
+EXERCISES_PATH = Path(__file__).resolve().parents[4] / "data" / "exercises" / "exercises.json"
 
 
-def _build_filter(body_area: Optional[str], goal: Optional[str]) -> Optional[Filter]:
+def _build_filter(body_area: Optional[str], goal: Optional[str]):
+    from cortex.filters import Filter, Field
+
     f = Filter()
     has_any = False
 
@@ -23,19 +34,11 @@ def _build_filter(body_area: Optional[str], goal: Optional[str]) -> Optional[Fil
     return f if has_any else None
 
 
-def _load_local_payload_map() -> Dict[int, Dict[str, Any]]:
+def _build_payload_map(exercises: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
     """
-    Map vector ID -> payload using local exercises.json.
+    Map vector ID -> payload from the parsed exercises.json.
     We ingested with ids = [0, 1, 2, ...], so this is stable.
     """
-    # apps/api/app/rag/vectorai_client.py -> repo root is parents[4]
-    repo_root = Path(__file__).resolve().parents[4]
-    data_path = repo_root / "data" / "exercises" / "exercises.json"
-
-    if not data_path.exists():
-        return {}
-
-    exercises = json.loads(data_path.read_text(encoding="utf-8"))
     payload_map: Dict[int, Dict[str, Any]] = {}
 
     for i, ex in enumerate(exercises):
@@ -73,14 +76,74 @@ def _load_local_payload_map() -> Dict[int, Dict[str, Any]]:
     return payload_map
 
 
+class PayloadIndex:
+    """
+    Process-wide payload index over exercises.json, keyed by vector id.
+    refresh() builds it, then stat()s the file at most every `check_interval` seconds, re-reads it
+    only when its mtime/size change and re-parses only when the content hash changes. refresh()
+    does file I/O, so async callers run it on a thread (when due()); get() never touches the file.
+    Readers get the current map without locking (it is swapped in whole). A file that fails
+    to parse (e.g. caught mid-write) keeps the previous index and is retried on the next check.
+    """
+
+    def __init__(self, path: Path = EXERCISES_PATH, check_interval: float = PAYLOAD_RELOAD_CHECK_SEC):
+        self.path = path
+        self.check_interval = check_interval
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._digest: Optional[str] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._loads = 0
+
+    def due(self) -> bool:
+        return time.monotonic() >= self._next_check
+
+    def refresh(self) -> None:
+        if not self.due():
+            return
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                st = self.path.stat()
+            except OSError:
+                self._by_id, self._signature, self._digest = {}, None, None
+                return
+            signature = (st.st_mtime_ns, st.st_size)
+            if signature == self._signature:
+                return
+            try:
+                data = self.path.read_bytes()
+                digest = hashlib.sha1(data).hexdigest()
+                if digest != self._digest:
+                    self._by_id = _build_payload_map(json.loads(data.decode("utf-8")))
+                    self._digest = digest
+                    self._loads += 1
+            except Exception:
+                return  # keep the previous index; signature unchanged so the next check retries
+            self._signature = signature
+
+    def get(self, vector_id: Any) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(vector_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._by_id), "loads": self._loads, "digest": self._digest}
+
+
+payload_index = PayloadIndex()
+
+
 def search_vectors(
     query_vec: List[float],
     body_area: Optional[str] = None,
     goal: Optional[str] = None,
     top_k: int = 6,
 ) -> List[Dict[str, Any]]:
+    from cortex import CortexClient
+
     filt = _build_filter(body_area, goal)
-    local_payload_map = _load_local_payload_map()
 
     with CortexClient(VECTORAI_ADDRESS) as client:
         if filt is not None:
@@ -97,10 +160,15 @@ def search_vectors(
                 top_k=top_k,
             )
 
+    payload_index.refresh()
+    return _to_docs(results)
+
+
+def _to_docs(results) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
     for r in results:
         rid = getattr(r, "id", None)
-        payload = getattr(r, "payload", None) or local_payload_map.get(rid, {})
+        payload = getattr(r, "payload", None) or payload_index.get(rid) or {}
         out.append(
             {
                 "id": rid,
@@ -108,4 +176,167 @@ def search_vectors(
                 "payload": payload,
             }
         )
-    return out
\ No newline at end of file
+    return out
+
+
+class VectorSearchUnavailable(ConnectionError):
+    """VectorAI could not be reached, even on a fresh connection."""
+
+
+def _is_connection_error(e: BaseException) -> bool:
+    """Transport failures worth one reconnect (not timeouts or bad requests)."""
+    if isinstance(e, (ConnectionError, BrokenPipeError)):
+        return True
+    code = getattr(e, "code", None)  # grpc.RpcError
+    if callable(code):
+        try:
+            return getattr(code(), "name", "") == "UNAVAILABLE"
+        except Exception:
+            return False
+    name = type(e).__name__
+    return "Connection" in name or "Unavailable" in name
+
+
+class AsyncVectorAIClient:
+    """
+    Long-lived VectorAI search client for the API, owned by the app lifespan (close() on shutdown).
+    One cortex CortexClient (the pinned SDK in requirements-chat.txt) is opened on first use and
+    reused for every search; its blocking calls run on a dedicated executor (not the default
+    to_thread pool). At most `max_concurrency` searches are in flight, each with a `timeout`
+    deadline. A transport failure drops the connection and retries once on a new one.
+    """
+
+    def __init__(
+        self,
+        address: str = VECTORAI_ADDRESS,
+        max_concurrency: int = VECTORAI_MAX_CONCURRENCY,
+        timeout: float = VECTORAI_TIMEOUT_SEC,
+    ):
+        self.address = address
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self._client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._in_flight = 0
+        self._searches = 0
+        self._connects = 0
+        self._reconnects = 0
+        self._timeouts = 0
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn, *args, **kwargs):
+        call = functools.partial(fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def _connect(self) -> None:
+        from cortex import CortexClient
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="vectorai")
+        client = CortexClient(self.address)
+        await self._run(client.__enter__)
+        self._client = client
+        self._connects += 1
+
+    async def _ensure(self):
+        self._bind_loop()
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    await self._connect()
+        return self._client
+
+    async def _drop(self, client=None) -> None:
+        """Close the connection; with `client`, only if it is still the current one (another
+        search may already have replaced the connection that failed for this caller)."""
+        if client is not None and self._client is not client:
+            return
+        current, self._client = self._client, None
+        if current is None:
+            return
+        try:
+            await self._run(current.__exit__, None, None, None)
+        except Exception:
+            pass
+
+    async def _call(self, fn, *args, **kwargs):
+        return await asyncio.wait_for(self._run(fn, *args, **kwargs), self.timeout)
+
+    async def search(
+        self,
+        query_vec: List[float],
+        body_area: Optional[str] = None,
+        goal: Optional[str] = None,
+        top_k: int = 6,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async search_vectors over the shared connection. Raises asyncio.TimeoutError past the
+        deadline and VectorSearchUnavailable when the retry on a new connection fails too.
+        """
+        filt = _build_filter(body_area, goal)
+        self._bind_loop()
+        async with self._sem:
+            self._in_flight += 1
+            self._searches += 1
+            try:
+                for attempt in (0, 1):
+                    client = None
+                    try:
+                        client = await self._ensure()
+                        if filt is not None:
+                            results = await self._call(
+                                client.search_filtered, VECTORAI_COLLECTION,
+                                query=query_vec, filter=filt, top_k=top_k,
+                            )
+                        else:
+                            results = await self._call(
+                                client.search, VECTORAI_COLLECTION, query=query_vec, top_k=top_k
+                            )
+                        break
+                    except asyncio.TimeoutError:
+                        self._timeouts += 1
+                        raise
+                    except Exception as e:
+                        if not _is_connection_error(e):
+                            raise
+                        if attempt:
+                            raise VectorSearchUnavailable(str(e)) from e
+                        self._reconnects += 1
+                        if client is not None:  # else connecting failed: nothing to close
+                            await self._drop(client)
+            finally:
+                self._in_flight -= 1
+        if payload_index.due():
+            await asyncio.to_thread(payload_index.refresh)  # stat/read/parse stay off the event loop
+        return _to_docs(results)
+
+    async def close(self) -> None:
+        await self._drop()
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self._client is not None,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "searches": self._searches,
+            "connects": self._connects,
+            "reconnects": self._reconnects,
+            "timeouts": self._timeouts,
+        }
+
+
+# Process-wide client used by rag.coach; the API lifespan closes it
+vector_client = AsyncVectorAIClient()
@@ -0,0 +1,84 @@
+import importlib.util
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import CHAT_WARMUP, EMBEDDING_BACKEND
+
+# Modules /chat needs at request time (imported lazily by embedder / vectorai_client), per embedding
+# backend. A cached ONNX export runs on onnxruntime + tokenizers alone; torch is only needed to export.
+_BACKEND_MODULES = {"torch": ("sentence_transformers",), "onnx": ("onnxruntime", "tokenizers")}
+_SEARCH_MODULES = ("cortex",)
+
+
+def _installed(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except Exception:
+        return False
+
+
+def missing_chat_modules(backend: str = EMBEDDING_BACKEND) -> List[str]:
+    """Chat dependencies for `backend` that aren't installed (checked without importing them)."""
+    if backend == "auto":
+        # Same choice as embedder._load_encoder: onnx when onnxruntime is installed, else torch
+        backend = "onnx" if _installed("onnxruntime") else "torch"
+    needed = _BACKEND_MODULES.get(backend, _BACKEND_MODULES["torch"]) + _SEARCH_MODULES
+    return [name for name in needed if not _installed(name)]
+
+
+class ChatWarmup:
+    """
+    Background warmup of the chat embedder, started from the API lifespan so startup (and /health)
+    never waits for torch/model loading. State: "disabled" (CHAT_WARMUP=0), "unavailable"
+    (dependencies missing), "cold", "warming", "ready" or "error". A failed warmup counts as ready
+    (with the reason in chat_error): there is nothing left to wait for, and /chat retries the load
+    on the next request. A payload index failure is reported separately and doesn't fail warmup.
+    """
+
+    def __init__(self, enabled: bool = CHAT_WARMUP):
+        self.enabled = enabled
+        missing = missing_chat_modules()
+        self.state = "unavailable" if missing else ("cold" if enabled else "disabled")
+        self.error: Optional[str] = f"missing modules: {', '.join(missing)}" if missing else None
+        self.payload_error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.state != "cold" or self._thread is not None:
+            return
+        self.state = "warming"
+        self._thread = threading.Thread(target=self._run, name="chat-warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            from .vectorai_client import payload_index
+
+            payload_index.refresh()  # builds the exercise payload index off the request path
+        except Exception as e:
+            # Search refreshes it again when due; the embedder is still worth warming
+            self.payload_error = str(e)
+        try:
+            from .embedder import warmup
+
+            warmup()
+        except Exception as e:
+            self.error = str(e)
+            self.state = "error"
+        else:
+            self.state = "ready"
+        self.seconds = round(time.perf_counter() - t0, 3)
+
+    @property
+    def ready(self) -> bool:
+        """Nothing left to wait for: warm, failed, or not applicable (disabled / chat unavailable)."""
+        return self.state not in ("cold", "warming")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready, "chat": self.state, "chat_error": self.error,
+            "payload_error": self.payload_error, "warmup_sec": self.seconds,
+        }
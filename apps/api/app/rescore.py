@@ -0,0 +1,83 @@
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .cv.rubrics import get_rubric
+from .cv.scoring import raw_columns, score_columns, tips_for, warnings_for, METRIC_KEYS
+from .storage import raw_metric_rows, save_job_scores
+
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "5000"))
+
+
+def rescore_jobs(rubric_version: Optional[str] = None, batch_size: int = RESCORE_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Re-score every done job's stored raw metrics with one rubric (no CV re-run) and store the
+    results in job_scores under that rubric version. Jobs are read in keyset pages of
+    `batch_size`; each page is scored in one vectorized pass and written in one transaction.
+    Returns counts and timings (read / score / write) for throughput reporting.
+    Raises KeyError for an unknown rubric version.
+    """
+    rubric = get_rubric(rubric_version)
+    batch_size = max(1, int(batch_size))
+
+    # Tip/warning lists repeat across jobs; serialize each distinct one once
+    tips_json: Dict[tuple, str] = {}
+    warnings_json: Dict[int, str] = {}
+
+    records = batches = 0
+    read_sec = score_sec = write_sec = 0.0
+    after = ""
+    t_start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        page = raw_metric_rows(METRIC_KEYS, after_job_id=after, limit=batch_size)
+        t1 = time.perf_counter()
+        read_sec += t1 - t0
+        if not page:
+            break
+
+        after = page[-1][0]
+        # Jobs without stored metrics (e.g. failed before analysis) have nothing to score
+        page = [(job_id, values) for job_id, values in page if any(v is not None for v in values)]
+        job_ids = [job_id for job_id, _ in page]
+        res = score_columns(raw_columns([dict(zip(METRIC_KEYS, values)) for _, values in page]), rubric)
+
+        rows: List[tuple] = []
+        for job_id, gate, tip_key, score, p, s, st, c in zip(
+            job_ids,
+            res["gate"].tolist(),
+            res["tip_key"].tolist(),
+            res["score"].tolist(),
+            res["posture"].tolist(),
+            res["stride"].tolist(),
+            res["stability"].tolist(),
+            res["cadence_proxy"].tolist(),
+        ):
+            tj = tips_json.get((gate, tip_key))
+            if tj is None:
+                tj = tips_json[(gate, tip_key)] = json.dumps(tips_for(gate, tip_key))
+            wj = warnings_json.get(gate)
+            if wj is None:
+                wj = warnings_json[gate] = json.dumps(warnings_for(gate))
+            rows.append((job_id, rubric.version, score, p, s, st, c, tj, wj))
+        t2 = time.perf_counter()
+        score_sec += t2 - t1
+
+        save_job_scores(rows)
+        write_sec += time.perf_counter() - t2
+
+        records += len(page)
+        batches += 1
+
+    total = time.perf_counter() - t_start
+    return {
+        "rubric_version": rubric.version,
+        "records": records,
+        "batches": batches,
+        "seconds": round(total, 4),
+        "read_sec": round(read_sec, 4),
+        "score_sec": round(score_sec, 4),
+        "write_sec": round(write_sec, 4),
+        "records_per_sec": round(records / total, 1) if total > 0 else 0.0,
+    }
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Serialized /results bodies kept in memory (LRU); 0 disables the cache
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "2048"))
+# Seconds a cached body is served before it is rebuilt; bounds staleness for changes made outside
+# the API process (e.g. worker_local.py run by hand), which never publish an invalidation
+RESULT_CACHE_TTL_SEC = float(os.getenv("RESULT_CACHE_TTL_SEC", "300"))
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison against an If-None-Match header value (list or *)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    want = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == want:
+            return True
+    return False
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of serialized ScoreResult bodies, keyed by (job_id, rubric_version).
+    Only terminal results are stored (see main._is_terminal), so an entry is normally only
+    replaced when a job's status changes: invalidate() is called for every stage event.
+    Thread-safe (sync endpoints run in the threadpool, invalidations come from pool threads).
+    """
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL_SEC):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, job_id: str, rubric_version: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        """(body, etag) or None."""
+        key = (job_id, rubric_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1], entry[2]
+
+    def put(self, job_id: str, rubric_version: Optional[str], body: bytes, etag: str) -> None:
+        if self.max_size <= 0:
+            return
+        key = (job_id, rubric_version)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, job_id: str) -> None:
+        """Drop every rubric-version entry of one job."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == job_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self._hits, "misses": self._misses}
@@ -6,8 +6,20 @@ class HealthResponse(BaseModel):
     ok: bool
 
 
+class ReadyResponse(BaseModel):
+    ready: bool
+    # chat embedder warmup: "disabled" | "unavailable" | "cold" | "warming" | "ready" | "error"
+    chat: str
+    chat_error: Optional[str] = None
+    # exercise payload index build failure during warmup (search retries it; not a readiness failure)
+    payload_error: Optional[str] = None
+    warmup_sec: Optional[float] = None
+
+
 class UploadResponse(BaseModel):
     job_id: str
+    # True when an identical upload was already analyzed and its result is reused
+    cached: bool = False
 
 
 class MetricScore(BaseModel):
@@ -24,9 +36,59 @@ class ScoreResult(BaseModel):
     metrics: List[MetricScore] = []
     tips: List[str] = []
     overlay_path: Optional[str] = None
+    # Overlay renders after scores are published: "done" status + "pending"/"rendering" here
+    # means scores are ready and the overlay video is still coming.
+    overlay_status: Optional[Literal["pending", "rendering", "done", "skipped", "error"]] = None
+    rubric_version: Optional[str] = None
     error: Optional[str] = None
 
 
+class RescoreRequest(BaseModel):
+    # None = the active rubric
+    rubric_version: Optional[str] = None
+    batch_size: Optional[int] = None
+
+
+class RescoreResponse(BaseModel):
+    rubric_version: str
+    records: int
+    batches: int
+    seconds: float
+    read_sec: float
+    score_sec: float
+    write_sec: float
+    records_per_sec: float
+
+
+class RubricsResponse(BaseModel):
+    active: str
+    versions: List[str]
+    # stored score rows per rubric version
+    scored: dict = {}
+
+
+class AdminStatsResponse(BaseModel):
+    # /results body cache (size, hits, misses)
+    result_cache: dict = {}
+    # CV worker pool (busy workers, queued jobs and overlays)
+    cv_pool: dict = {}
+    # Databricks outbox flusher (pending / dead ops, failed batches, last error)
+    databricks_sync: dict = {}
+
+
+class ChatStatsResponse(BaseModel):
+    # query embedding cache hits/misses (memory and disk tier)
+    embed_cache: dict = {}
+    # micro-batcher queue depth and batch sizes
+    embed_batcher: dict = {}
+    # selected embedding backend (torch / onnx) and why ONNX was rejected, if it was
+    embed_backend: dict = {}
+    # exercise payload index (entries, reloads, content hash)
+    payload_index: dict = {}
+    # shared VectorAI connection (in-flight searches, reconnects, timeouts)
+    vector_client: dict = {}
+
+
 class ChatRequest(BaseModel):
     message: str
     # later: include run_context and/or body_part extraction
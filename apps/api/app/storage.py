@@ -1,66 +1,505 @@
 import os
+import asyncio
+import hashlib
 import json
+import sqlite3
+import tempfile
+import threading
+import time
 import uuid
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, List
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 STORAGE_DIR = os.path.join(BASE_DIR, "storage")
 UPLOADS_DIR = os.path.join(STORAGE_DIR, "uploads")
-JOBS_PATH = os.path.join(STORAGE_DIR, "jobs.json")
+JOBS_PATH = os.path.join(STORAGE_DIR, "jobs.json")  # legacy store, imported once into JOBS_DB_PATH
+JOBS_DB_PATH = os.path.join(STORAGE_DIR, "jobs.db")
 
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(500 * 1024 * 1024)))
 
-def _load_jobs() -> Dict[str, Any]:
+# Columns stored outside the JSON payload so they can be indexed.
+_COLUMNS = ("job_id", "status", "filename", "created_at", "updated_at", "content_key")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+  job_id TEXT PRIMARY KEY,
+  status TEXT NOT NULL,
+  filename TEXT,
+  created_at REAL NOT NULL,
+  updated_at REAL NOT NULL,
+  data TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+CREATE TABLE IF NOT EXISTS job_scores (
+  job_id TEXT NOT NULL,
+  rubric_version TEXT NOT NULL,
+  score INTEGER NOT NULL,
+  posture INTEGER NOT NULL,
+  stride INTEGER NOT NULL,
+  stability INTEGER NOT NULL,
+  cadence_proxy INTEGER NOT NULL,
+  tips TEXT NOT NULL DEFAULT '[]',
+  warnings TEXT NOT NULL DEFAULT '[]',
+  scored_at REAL NOT NULL,
+  PRIMARY KEY (job_id, rubric_version)
+);
+CREATE INDEX IF NOT EXISTS idx_job_scores_rubric ON job_scores (rubric_version);
+CREATE TABLE IF NOT EXISTS databricks_outbox (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  job_id TEXT NOT NULL,
+  payload TEXT NOT NULL DEFAULT '{}',
+  created_at REAL NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at REAL NOT NULL DEFAULT 0,
+  lease_until REAL NOT NULL DEFAULT 0,
+  last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_ready ON databricks_outbox (next_attempt_at, id);
+CREATE INDEX IF NOT EXISTS idx_outbox_job ON databricks_outbox (job_id, id);
+"""
+
+# Columns added after the first release of the jobs table: (name, type, index DDL)
+_ADDED_COLUMNS = [
+    (
+        "content_key",
+        "TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_content_key ON jobs (content_key, status, created_at)",
+    ),
+]
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_pid: int | None = None
+
+
+def _init_db(conn: sqlite3.Connection) -> None:
+    global _initialized_pid
+    with _init_lock:
+        if _initialized_pid == os.getpid():
+            return
+        conn.executescript(_SCHEMA)
+        _migrate(conn)
+        _import_legacy_jobs(conn)
+        _initialized_pid = os.getpid()
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    One SQLite connection per thread (and per process: worker subprocesses get their own).
+    WAL lets the API read while workers write; busy_timeout serializes concurrent writers.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+
+    os.makedirs(STORAGE_DIR, exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30.0, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    _init_db(conn)
+
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    existing = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)").fetchall()}
+    for name, col_type, index_ddl in _ADDED_COLUMNS:
+        if name not in existing:
+            try:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {col_type}")
+            except sqlite3.OperationalError:
+                # another process added it first
+                pass
+        if index_ddl:
+            conn.execute(index_ddl)
+
+
+def _import_legacy_jobs(conn: sqlite3.Connection) -> None:
+    """Move jobs from the old whole-file jobs.json store into SQLite (runs once)."""
     if not os.path.exists(JOBS_PATH):
-        return {}
+        return
     try:
         with open(JOBS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+            legacy = json.load(f)
     except Exception:
-        return {}
+        legacy = {}
 
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for i, (job_id, job) in enumerate((legacy or {}).items()):
+            job = dict(job or {})
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, status, filename, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    job.pop("status", "queued"),
+                    job.pop("filename", None),
+                    # keep insertion order of the old file as created order
+                    now - len(legacy) + i,
+                    now,
+                    json.dumps(_payload(job)),
+                ),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    try:
+        os.replace(JOBS_PATH, JOBS_PATH + ".migrated")
+    except OSError:
+        pass
 
-def _save_jobs(jobs: Dict[str, Any]) -> None:
-    os.makedirs(STORAGE_DIR, exist_ok=True)
-    with open(JOBS_PATH, "w", encoding="utf-8") as f:
-        json.dump(jobs, f, indent=2)
 
+def _payload(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in job.items() if k not in _COLUMNS}
 
-def create_job(filename: str) -> str:
-    jobs = _load_jobs()
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = json.loads(row["data"] or "{}")
+    job.update(
+        {
+            "job_id": row["job_id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "content_key": row["content_key"],
+        }
+    )
+    return job
+
+
+def create_job(filename: str, content_key: str | None = None) -> str:
+    conn = _connect()
     job_id = str(uuid.uuid4())
-    jobs[job_id] = {
-        "job_id": job_id,
-        "status": "queued",
-        "filename": filename,
-    }
-    _save_jobs(jobs)
+    now = time.time()
+    conn.execute(
+        "INSERT INTO jobs (job_id, status, filename, created_at, updated_at, content_key, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, '{}')",
+        (job_id, "queued", filename, now, now, content_key),
+    )
     return job_id
 
 
 def set_job_status(job_id: str, status: str, extra: Dict[str, Any] | None = None) -> None:
-    jobs = _load_jobs()
-    if job_id not in jobs:
+    conn = _connect()
+    if not extra:
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+            (status, time.time(), job_id),
+        )
         return
-    jobs[job_id]["status"] = status
-    if extra:
-        jobs[job_id].update(extra)
-    _save_jobs(jobs)
+
+    extra = dict(extra)
+    filename = extra.pop("filename", None)
+
+    # Read-modify-write of the payload under a write lock so concurrent workers don't lose updates
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return
+        data = json.loads(row["data"] or "{}")
+        data.update(_payload(extra))
+        conn.execute(
+            "UPDATE jobs SET status = ?, filename = COALESCE(?, filename), updated_at = ?, data = ? "
+            "WHERE job_id = ?",
+            (status, filename, time.time(), json.dumps(data), job_id),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
 
 
 def get_job(job_id: str) -> Dict[str, Any] | None:
-    jobs = _load_jobs()
-    return jobs.get(job_id)
+    row = _connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def find_done_job(content_key: str) -> Dict[str, Any] | None:
+    """
+    Most recent finished job for the same upload content + analysis config, if any. Fallback jobs
+    (analysis failed) are never reused, so a re-upload gets a fresh run.
+    """
+    row = _connect().execute(
+        "SELECT * FROM jobs WHERE content_key = ? AND status = 'done' "
+        "AND NOT COALESCE(json_extract(data, '$.fallback'), 0) ORDER BY created_at DESC LIMIT 1",
+        (content_key,),
+    ).fetchone()
+    return _row_to_job(row) if row else None
 
 
-def save_upload(file_bytes: bytes, original_name: str) -> str:
+def list_jobs(
+    status: str | None = None,
+    limit: int = 100,
+    before: float | None = None,
+    before_job_id: str | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Newest-first page of jobs, optionally filtered by status.
+    Pass the last job's created_at as `before` and its job_id as `before_job_id` to fetch the next
+    page; the job_id tie-break keeps jobs created in the same instant from being skipped.
+    """
+    clauses = []
+    params: list = []
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    if before is not None:
+        if before_job_id is not None:
+            clauses.append("(created_at, job_id) < (?, ?)")
+            params.extend([before, before_job_id])
+        else:
+            clauses.append("created_at < ?")
+            params.append(before)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    params.append(int(limit))
+
+    rows = _connect().execute(
+        f"SELECT * FROM jobs {where} ORDER BY created_at DESC, job_id DESC LIMIT ?",
+        params,
+    ).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+
+def _upload_path(original_name: str) -> str:
     safe_name = original_name.replace("/", "_").replace("\\", "_")
     path = os.path.join(UPLOADS_DIR, safe_name)
     # if name exists, make it unique
     if os.path.exists(path):
         root, ext = os.path.splitext(safe_name)
         path = os.path.join(UPLOADS_DIR, f"{root}-{uuid.uuid4().hex[:8]}{ext}")
-    with open(path, "wb") as f:
-        f.write(file_bytes)
     return path
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class EmptyUpload(Exception):
+    pass
+
+
+@dataclass
+class StagedUpload:
+    temp_path: str
+    size: int
+    sha256: str
+
+
+def _write_chunk(f, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+async def stage_upload(upload, max_bytes: int = MAX_UPLOAD_BYTES) -> StagedUpload:
+    """
+    Stream an UploadFile to a temp file in UPLOADS_DIR in fixed-size chunks,
+    hashing as we go. Disk writes run off the event loop; peak memory is one chunk.
+    Raises UploadTooLarge / EmptyUpload (the temp file is removed in both cases).
+    """
+    fd, temp_path = tempfile.mkstemp(dir=UPLOADS_DIR, suffix=".part")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                await asyncio.to_thread(_write_chunk, f, hasher, chunk)
+        if size == 0:
+            raise EmptyUpload("Empty file")
+    except BaseException:
+        discard_staged_upload(temp_path)
+        raise
+
+    return StagedUpload(temp_path=temp_path, size=size, sha256=hasher.hexdigest())
+
+
+def commit_upload(staged: StagedUpload, original_name: str) -> str:
+    """Atomically move a staged upload to its final name under UPLOADS_DIR."""
+    path = _upload_path(original_name)
+    os.replace(staged.temp_path, path)
+    return path
+
+
+def discard_staged_upload(temp_path: str) -> None:
+    try:
+        os.remove(temp_path)
+    except OSError:
+        pass
+
+
+def raw_metric_rows(keys: tuple, after_job_id: str = "", limit: int = 5000) -> List[tuple]:
+    """
+    Page of (job_id, [metrics[k] for k in keys]) for done jobs in job_id order, decoded from a
+    single multi-path json_extract per row. Pass the last job_id as `after_job_id` for the next page.
+    Fallback jobs (analysis failed, see worker_local.process_video) are left out: they have no scores.
+    """
+    paths = ", ".join("?" for _ in keys)
+    rows = _connect().execute(
+        # +status keeps the planner on the primary key (keyset order) instead of the status index
+        f"SELECT job_id, json_extract(data, {paths}) AS m FROM jobs "
+        "WHERE +status = 'done' AND NOT COALESCE(json_extract(data, '$.fallback'), 0) "
+        "AND job_id > ? ORDER BY job_id LIMIT ?",
+        [f"$.metrics.{k}" for k in keys] + [after_job_id, int(limit)],
+    ).fetchall()
+    return [(r["job_id"], json.loads(r["m"])) for r in rows]
+
+
+def save_job_scores(rows: List[tuple]) -> None:
+    """
+    Upsert (job_id, rubric_version, score, posture, stride, stability, cadence_proxy,
+    tips_json, warnings_json) rows in one transaction.
+    """
+    if not rows:
+        return
+    now = time.time()
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO job_scores "
+            "(job_id, rubric_version, score, posture, stride, stability, cadence_proxy, tips, warnings, scored_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [tuple(r) + (now,) for r in rows],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def get_job_score(job_id: str, rubric_version: str) -> Dict[str, Any] | None:
+    row = _connect().execute(
+        "SELECT * FROM job_scores WHERE job_id = ? AND rubric_version = ?",
+        (job_id, rubric_version),
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "job_id": row["job_id"],
+        "rubric_version": row["rubric_version"],
+        "score": row["score"],
+        "subscores": {
+            "posture": row["posture"],
+            "stride": row["stride"],
+            "stability": row["stability"],
+            "cadence_proxy": row["cadence_proxy"],
+        },
+        "tips": json.loads(row["tips"]),
+        "warnings": json.loads(row["warnings"]),
+        "scored_at": row["scored_at"],
+    }
+
+
+def count_job_scores() -> Dict[str, int]:
+    """Stored score rows per rubric version."""
+    rows = _connect().execute(
+        "SELECT rubric_version, COUNT(*) AS n FROM job_scores GROUP BY rubric_version"
+    ).fetchall()
+    return {r["rubric_version"]: r["n"] for r in rows}
+
+
+# --- Databricks write-behind outbox (see app.databricks_sync) ---
+
+
+def enqueue_outbox(kind: str, job_id: str, payload: Dict[str, Any]) -> None:
+    _connect().execute(
+        "INSERT INTO databricks_outbox (kind, job_id, payload, created_at) VALUES (?, ?, ?, ?)",
+        (kind, job_id, json.dumps(payload), time.time()),
+    )
+
+
+def claim_outbox(limit: int, lease_sec: float, max_attempts: int) -> List[Dict[str, Any]]:
+    """
+    Lease up to `limit` ready ops, oldest first. An op is skipped while an older op for the same
+    job is still waiting for a retry (or has used up `max_attempts`; 0 = no limit), so each job's
+    mutations apply in order. Leased ops are invisible to other flushers until `lease_sec` passes
+    (crash recovery).
+    """
+    now = time.time()
+    cap = max_attempts if max_attempts > 0 else -1  # -1: no limit
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT * FROM databricks_outbox o "
+            "WHERE o.next_attempt_at <= ? AND o.lease_until <= ? AND (? < 0 OR o.attempts < ?) "
+            "AND NOT EXISTS (SELECT 1 FROM databricks_outbox p "
+            "                WHERE p.job_id = o.job_id AND p.id < o.id "
+            "                AND (p.next_attempt_at > ? OR p.lease_until > ? "
+            "                     OR (? >= 0 AND p.attempts >= ?))) "
+            "ORDER BY o.id LIMIT ?",
+            (now, now, cap, cap, now, now, cap, cap, int(limit)),
+        ).fetchall()
+        if rows:
+            conn.execute(
+                f"UPDATE databricks_outbox SET lease_until = ? WHERE id IN ({','.join('?' * len(rows))})",
+                [now + lease_sec] + [r["id"] for r in rows],
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return [
+        {
+            "id": r["id"],
+            "kind": r["kind"],
+            "job_id": r["job_id"],
+            "payload": json.loads(r["payload"] or "{}"),
+            "created_at": r["created_at"],
+            "attempts": r["attempts"],
+        }
+        for r in rows
+    ]
+
+
+def complete_outbox(ids: List[int]) -> None:
+    if not ids:
+        return
+    _connect().execute(f"DELETE FROM databricks_outbox WHERE id IN ({','.join('?' * len(ids))})", ids)
+
+
+def retry_outbox(ids: List[int], error: str, delay_sec: float, attempted: bool = True) -> None:
+    """Release leased ops for another attempt after `delay_sec` (counted unless not `attempted`)."""
+    if not ids:
+        return
+    _connect().execute(
+        "UPDATE databricks_outbox SET attempts = attempts + ?, next_attempt_at = ?, lease_until = 0, "
+        f"last_error = ? WHERE id IN ({','.join('?' * len(ids))})",
+        [1 if attempted else 0, time.time() + delay_sec, error[:2000]] + list(ids),
+    )
+
+
+def outbox_stats(max_attempts: int) -> Dict[str, Any]:
+    """Outbox depth; `dead` counts ops parked at `max_attempts` (always 0 without a limit)."""
+    row = _connect().execute(
+        "SELECT COUNT(*) AS pending, SUM(? > 0 AND attempts >= ?) AS dead, MIN(created_at) AS oldest "
+        "FROM databricks_outbox",
+        (max_attempts, max_attempts),
+    ).fetchone()
+    return {
+        "pending": row["pending"] or 0,
+        "dead": row["dead"] or 0,
+        "oldest_age_sec": round(time.time() - row["oldest"], 1) if row["oldest"] else 0.0,
+    }
@@ -1,9 +1,10 @@
 import argparse
+import json
 import os
 import shutil
-import subprocess
 import sys
-import tempfile
+import time
+from typing import Callable
 
 # Make imports work whether this file is run as:
 # - module: python -m app.worker_local
@@ -14,210 +15,132 @@ if API_ROOT not in sys.path:
     sys.path.insert(0, API_ROOT)
 
 try:
-    from app.storage import set_job_status, get_job
+    from app.storage import set_job_status, get_job, save_job_scores
 except Exception:
     # Fallback if run as module/package in some contexts
-    from .storage import set_job_status, get_job
+    from .storage import set_job_status, get_job, save_job_scores
 
-from app.cv.analyzer import analyze_running_video
+from app.cv.analyzer import extract_landmark_timeline, analyze_timeline
+from app.cv.overlay import render_pose_overlay
+from app.cv.timeline import save_timeline, load_timeline
+from app.cv.ffmpeg import reencode_browser_safe_mp4
 from app.cv.scoring import score_running_form
+from app.cv.rubrics import get_rubric
+from app.cv.metrics import compute_metrics
+from app.cv.config import (
+    CV_SAMPLE_EVERY_N,
+    CV_MODEL_COMPLEXITY,
+    CV_SEGMENT_WORKERS,
+    CV_PROGRESS_INTERVAL_SEC,
+    CV_INTERIM_METRICS_SEC,
+)
+from app.cv.pose import create_pose
 
 try:
-    from app import databricks_client
+    from app import databricks_sync
 except Exception:
-    try:
-        from . import databricks_client
-    except Exception:
-        databricks_client = None
+    from . import databricks_sync
 
 
-def _esc_sql(s: str) -> str:
-    return str(s).replace("'", "''")
+def _overlay_path_for(job_id: str) -> str:
+    return os.path.join(THIS_DIR, "..", "storage", "uploads", f"{job_id}-overlay.mp4")
 
 
-def _ffmpeg_exe() -> str | None:
-    """
-    Return ffmpeg executable path if available, else None.
-    Works with PATH or common winget install locations.
-    """
-    # PATH first
-    ff = shutil.which("ffmpeg")
-    if ff:
-        return ff
-
-    # Common Windows fallback guesses (winget usually adds PATH, but just in case)
-    candidates = [
-        os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Links\ffmpeg.exe"),
-        os.path.expandvars(r"%ProgramFiles%\ffmpeg\bin\ffmpeg.exe"),
-        os.path.expandvars(r"%ProgramFiles%\Gyan\FFmpeg\bin\ffmpeg.exe"),
-    ]
-    for c in candidates:
-        if c and os.path.exists(c):
-            return c
-    return None
-
-
-def _reencode_browser_safe_mp4(src_path: str, dst_path: str) -> None:
-    """
-    Re-encode video to browser-safe MP4 (H.264 + yuv420p + faststart) using ffmpeg.
-    Raises on failure.
-    """
-    ffmpeg = _ffmpeg_exe()
-    if not ffmpeg:
-        raise RuntimeError("ffmpeg not found")
-
-    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-
-    cmd = [
-        ffmpeg,
-        "-y",
-        "-i", src_path,
-        "-an",                     # drop audio for demo reliability (optional)
-        "-c:v", "libx264",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
-        dst_path,
-    ]
-
-    proc = subprocess.run(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-    )
-    if proc.returncode != 0:
-        raise RuntimeError(f"ffmpeg re-encode failed: {proc.stderr[-1000:]}")
-
-
-def _generate_pose_overlay_video(input_path: str, output_path: str, max_frames: int | None = None) -> None:
-    """
-    Generate an annotated overlay video with MediaPipe Pose landmarks.
-    Writes a browser-safe MP4 to output_path.
-    Strategy:
-      1) Render annotated video with OpenCV to a temp mp4
-      2) Re-encode with ffmpeg to H.264/yuv420p for browser playback
-    Raises exception on failure (caller can fallback to copy).
-    """
-    import cv2
-    import mediapipe as mp
-
-    cap = cv2.VideoCapture(input_path)
-    if not cap.isOpened():
-        raise RuntimeError("Could not open input video for overlay generation")
-
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    if not fps or fps <= 0:
-        fps = 30.0
-
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
-    if width <= 0 or height <= 0:
-        cap.release()
-        raise RuntimeError("Invalid video dimensions")
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    # Write to a temp mp4 first (OpenCV codec), then ffmpeg -> browser-safe mp4
-    temp_dir = tempfile.mkdtemp(prefix="pose_overlay_")
-    temp_raw_mp4 = os.path.join(temp_dir, "overlay_raw.mp4")
-
-    writer = None
-    writer_errs = []
-    for fourcc_name in ["mp4v", "avc1"]:
-        fourcc = cv2.VideoWriter_fourcc(*fourcc_name)
-        w = cv2.VideoWriter(temp_raw_mp4, fourcc, fps, (width, height))
-        if w.isOpened():
-            writer = w
-            break
-        writer_errs.append(fourcc_name)
-
-    if writer is None:
-        cap.release()
-        raise RuntimeError(f"Could not open VideoWriter (tried codecs: {writer_errs})")
-
-    mp_pose = mp.solutions.pose
-    mp_drawing = mp.solutions.drawing_utils
-    mp_drawing_styles = mp.solutions.drawing_styles
-
-    frame_count = 0
-    pose_detected_frames = 0
+class _Progress:
+    """Throttled progress events for one job stage; no-op without an `emit` callback."""
 
-    try:
-        with mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-        ) as pose:
-            while True:
-                ok, frame = cap.read()
-                if not ok:
-                    break
-
-                frame_count += 1
-                if max_frames is not None and frame_count > max_frames:
-                    break
-
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                result = pose.process(rgb)
-
-                annotated = frame.copy()
-
-                if result.pose_landmarks:
-                    pose_detected_frames += 1
-                    mp_drawing.draw_landmarks(
-                        annotated,
-                        result.pose_landmarks,
-                        mp_pose.POSE_CONNECTIONS,
-                        landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style(),
-                    )
+    def __init__(self, emit: Callable[[dict], None] | None, job_id: str, stage: str):
+        self.emit = emit
+        self.job_id = job_id
+        self.stage = stage
+        self._last = 0.0
+        self._last_metrics = time.monotonic()
 
-                cv2.putText(
-                    annotated,
-                    "Running Coach Pose Overlay",
-                    (12, 28),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.7,
-                    (255, 255, 255),
-                    2,
-                    cv2.LINE_AA,
-                )
-
-                writer.write(annotated)
-    finally:
-        cap.release()
-        writer.release()
-
-    # Re-encode for browser compatibility
-    _reencode_browser_safe_mp4(temp_raw_mp4, output_path)
-
-    # Best-effort temp cleanup
-    try:
-        shutil.rmtree(temp_dir, ignore_errors=True)
-    except Exception:
-        pass
-
-    # We intentionally do not raise if no pose frames detected; overlay is still useful for demo.
+    def __call__(self, frames_done: int, frames_total: int, partial=None) -> None:
+        if self.emit is None:
+            return
+        now = time.monotonic()
+        if now - self._last < CV_PROGRESS_INTERVAL_SEC:
+            return
+        self._last = now
 
-
-def process_video(job_id: str, input_path: str):
+        msg = {
+            "event": "progress",
+            "job_id": self.job_id,
+            "stage": self.stage,
+            "frames_done": int(frames_done),
+            "frames_total": int(frames_total),
+        }
+        if partial is not None and CV_INTERIM_METRICS_SEC > 0 and now - self._last_metrics >= CV_INTERIM_METRICS_SEC:
+            self._last_metrics = now
+            try:
+                timeline = partial()
+                if timeline is not None:
+                    interim = compute_metrics(timeline)
+                    if interim.get("ok"):
+                        msg["metrics"] = interim["raw_metrics"]
+            except Exception:
+                pass
+        self.emit(msg)
+
+
+def _emit_stage(emit: Callable[[dict], None] | None, job_id: str, stage: str, **extra) -> None:
+    if emit is not None:
+        emit({"event": "stage", "job_id": job_id, "stage": stage, **extra})
+
+
+def process_video(
+    job_id: str,
+    input_path: str,
+    pose=None,
+    render_overlay: bool = True,
+    emit: Callable[[dict], None] | None = None,
+) -> dict | None:
     """
     Process video locally with CV scoring.
-    Stores overlay locally (annotated pose video if possible; otherwise copies original).
+    Scores are published (status 'done', overlay_status 'pending') as soon as metrics are ready;
+    the overlay is a separate stage (render_job_overlay). With render_overlay=True it runs right
+    away; the worker pool passes False and schedules the returned overlay task at lower priority.
     Updates Databricks SQL metadata/results if available.
+    `pose` is an optional pre-built MediaPipe Pose (warm worker); it runs once per sampled frame.
+    `emit` receives stage transitions and throttled progress (frames, interim metrics) as dicts.
     """
     job = get_job(job_id)
     if not job:
         set_job_status(job_id, "error", {"error": "job not found"})
-        return
+        _emit_stage(emit, job_id, "error")
+        return None
+
+    set_job_status(job_id, "processing")
+    _emit_stage(emit, job_id, "processing")
 
     try:
-        # Run CV analysis
-        raw = analyze_running_video(input_path)
+        rubric = get_rubric()
+
+        # Single decode + Pose pass; metrics and overlay both consume this timeline
+        timeline = extract_landmark_timeline(
+            input_path,
+            sample_every_n=CV_SAMPLE_EVERY_N,
+            model_complexity=CV_MODEL_COMPLEXITY,
+            pose=pose,
+            segment_workers=CV_SEGMENT_WORKERS,
+            progress=_Progress(emit, job_id, "inference"),
+        )
+        _emit_stage(emit, job_id, "scoring")
+        raw = analyze_timeline(timeline)
+
+        storage_dir = os.path.join(THIS_DIR, "..", "storage", "uploads")
+        os.makedirs(storage_dir, exist_ok=True)
+
+        # Keep the landmarks so metrics/scores can be recomputed later without re-running pose
+        landmarks_path = None
+        try:
+            landmarks_path = save_timeline(timeline, os.path.join(storage_dir, job_id))
+        except Exception:
+            pass
 
         if raw.get("ok"):
-            scored = score_running_form(raw["raw_metrics"])
+            scored = score_running_form(raw["raw_metrics"], rubric)
             overall_score = int(scored.get("score", 60))
             tips_arr = scored.get("tips", [])
             subscores = scored.get("subscores", {})
@@ -238,146 +161,214 @@ def process_video(job_id: str, input_path: str):
             fallback = True
             error_msg = raw.get("error")
 
-        # Create overlay path
-        overlay_name = f"{job_id}-overlay.mp4"
-        storage_dir = os.path.join(THIS_DIR, "..", "storage", "uploads")
-        os.makedirs(storage_dir, exist_ok=True)
-        overlay_path = os.path.join(storage_dir, overlay_name)
-
-        # Try generating annotated overlay; fallback to browser-safe re-encode of original; final fallback copy
-        overlay_generated = False
-        overlay_error = None
-        ffmpeg_used = False
-
-        try:
-            _generate_pose_overlay_video(input_path, overlay_path)
-            overlay_generated = True
-            ffmpeg_used = True
-        except Exception as e:
-            overlay_error = str(e)
-
-            # Try at least making the original browser-safe if ffmpeg exists
-            try:
-                _reencode_browser_safe_mp4(input_path, overlay_path)
-                ffmpeg_used = True
-            except Exception as e2:
-                # Final fallback: raw copy (may not play in browser depending on codec)
-                overlay_error = f"{overlay_error} | fallback re-encode failed: {e2}"
-                shutil.copyfile(input_path, overlay_path)
-
         # Update local job status
         local_payload = {
-            "overlay_path": overlay_path,
+            "overlay_path": None,
+            "overlay_status": "pending",
             "overall_score": overall_score,
             "tips": tips_arr,
             "metrics": metrics_payload,
             "warnings": warnings_arr,
             "fallback": fallback,
-            "overlay_generated": overlay_generated,
-            "ffmpeg_used": ffmpeg_used,
+            "rubric_version": rubric.version,
+            "landmarks_path": landmarks_path,
         }
-        if overlay_error:
-            local_payload["overlay_error"] = overlay_error
         if error_msg:
             local_payload["error"] = error_msg
         set_job_status(job_id, "done", local_payload)
+        _emit_stage(emit, job_id, "done", overall_score=overall_score)
 
-        # Update Databricks SQL metadata + results row if available
+        # Per-rubric score history (see app.rescore); other rubric versions are filled in by re-scoring
+        if not fallback:
+            try:
+                save_job_scores([(
+                    job_id,
+                    rubric.version,
+                    overall_score,
+                    subscores.get("posture", 0),
+                    subscores.get("stride", 0),
+                    subscores.get("stability", 0),
+                    subscores.get("cadence_proxy", 0),
+                    json.dumps(tips_arr),
+                    json.dumps(warnings_arr),
+                )])
+            except Exception:
+                pass
+
+        # Databricks metadata + results row, written behind by the API's sync thread
         try:
-            if databricks_client is not None:
-                databricks_client.execute_sql(
-                    f"UPDATE uploads SET status='done', overlay_path='{_esc_sql(overlay_path)}', error=NULL "
-                    f"WHERE job_id='{_esc_sql(job_id)}'"
-                )
-
-                # Build metrics map in the shape /results expects:
-                # map(name -> named_struct('score', <int>, 'mean', <float>))
-                metric_entries = []
-
-                # Subscores first (these are likely what the frontend shows)
-                for name, score_val in subscores.items():
-                    raw_mean = metrics_payload.get(name)
-                    if raw_mean is None:
-                        raw_mean = score_val
-                    try:
-                        raw_mean_num = float(raw_mean)
-                    except Exception:
-                        raw_mean_num = float(score_val)
-
-                    metric_entries.append(
-                        f"'{_esc_sql(name)}', named_struct('score', {int(score_val)}, 'mean', {raw_mean_num})"
-                    )
-
-                # Add raw metrics (debug/demo visibility)
-                raw_metric_keys = [
-                    "avg_torso_lean_deg",
-                    "overstride_ratio",
-                    "knee_drive_ratio",
-                    "vertical_oscillation_norm",
-                    "cadence_spm_est",
-                    "pose_frames",
-                    "frames_used",
-                ]
-                for raw_key in raw_metric_keys:
-                    raw_val = metrics_payload.get(raw_key)
-                    if raw_val is None:
-                        continue
-                    try:
-                        raw_val_num = float(raw_val)
-                    except Exception:
-                        continue
-
-                    metric_entries.append(
-                        f"'{_esc_sql(raw_key)}', named_struct('score', 0, 'mean', {raw_val_num})"
-                    )
-
-                metrics_sql = "map()"
-                if metric_entries:
-                    metrics_sql = f"map({', '.join(metric_entries)})"
-
-                tips_sql = "array()"
-                if tips_arr:
-                    tips_sql = "array(" + ", ".join(f"'{_esc_sql(t)}'" for t in tips_arr) + ")"
-
-                # If rerun happens for same job_id, prevent duplicate row issues
+            # map(name -> {score, mean}) in the shape /results expects; subscores first
+            # (these are what the frontend shows), then raw metrics for debug/demo visibility
+            metric_map = {}
+            for name, score_val in subscores.items():
+                raw_mean = metrics_payload.get(name)
+                if raw_mean is None:
+                    raw_mean = score_val
                 try:
-                    databricks_client.execute_sql(
-                        f"DELETE FROM video_results WHERE job_id='{_esc_sql(job_id)}'"
-                    )
+                    raw_mean_num = float(raw_mean)
                 except Exception:
-                    pass
-
-                q = (
-                    "INSERT INTO video_results "
-                    "(job_id, overall_score, metrics, tips, overlay_path, rubric_version, created_at) "
-                    f"VALUES ('{_esc_sql(job_id)}', {overall_score}, {metrics_sql}, {tips_sql}, "
-                    f"'{_esc_sql(overlay_path)}', '0.2.1-cv-overlay-ffmpeg', current_timestamp())"
-                )
-                databricks_client.execute_sql(q)
+                    raw_mean_num = float(score_val)
+                metric_map[name] = {"score": int(score_val), "mean": raw_mean_num}
+
+            raw_metric_keys = [
+                "avg_torso_lean_deg",
+                "overstride_ratio",
+                "knee_drive_ratio",
+                "vertical_oscillation_norm",
+                "cadence_spm_est",
+                "pose_frames",
+                "frames_used",
+            ]
+            for raw_key in raw_metric_keys:
+                raw_val = metrics_payload.get(raw_key)
+                if raw_val is None:
+                    continue
+                try:
+                    metric_map[raw_key] = {"score": 0, "mean": float(raw_val)}
+                except Exception:
+                    continue
 
+            databricks_sync.record_upload_status(job_id, "done")
+            databricks_sync.record_result(job_id, overall_score, metric_map, tips_arr, rubric.version)
         except Exception:
-            # Databricks update failed but local storage succeeded; continue
+            # Databricks sync is best effort; local storage succeeded
             pass
 
     except Exception as e:
         err = str(e)
         set_job_status(job_id, "error", {"error": err})
+        _emit_stage(emit, job_id, "error")
+        databricks_sync.record_upload_status(job_id, "error", err)
+        return None
+
+    if render_overlay:
+        render_job_overlay(job_id, input_path, landmarks_path, timeline=timeline, emit=emit)
+        return None
+    return {"job_id": job_id, "input_path": input_path, "landmarks_path": landmarks_path}
+
+
+def render_job_overlay(
+    job_id: str,
+    input_path: str,
+    landmarks_path: str | None = None,
+    timeline=None,
+    emit: Callable[[dict], None] | None = None,
+) -> None:
+    """
+    Overlay stage: render the pose overlay for an already-scored job.
+    Uses the in-memory timeline if given, else the one persisted at landmarks_path.
+    Falls back to a browser-safe re-encode (or a raw copy) of the original if rendering fails.
+    """
+    # The start time lets a re-upload tell a render that is still running from one whose worker died
+    set_job_status(job_id, "done", {"overlay_status": "rendering", "overlay_started_at": time.time()})
+    _emit_stage(emit, job_id, "overlay_rendering")
+
+    overlay_path = _overlay_path_for(job_id)
+    os.makedirs(os.path.dirname(overlay_path), exist_ok=True)
+
+    # Try generating annotated overlay; fallback to browser-safe re-encode of original; final fallback copy
+    overlay_generated = False
+    overlay_error = None
+    ffmpeg_used = False
+    overlay_status = "done"
+
+    try:
+        if timeline is None:
+            if not landmarks_path:
+                raise RuntimeError("no stored landmarks for this job")
+            timeline = load_timeline(landmarks_path)
+        render_pose_overlay(input_path, overlay_path, timeline, progress=_Progress(emit, job_id, "overlay"))
+        overlay_generated = True
+        ffmpeg_used = True
+    except Exception as e:
+        overlay_error = str(e)
+
+        # Try at least making the original browser-safe if ffmpeg exists
         try:
-            if databricks_client is not None:
-                databricks_client.execute_sql(
-                    f"UPDATE uploads SET status='error', error='{_esc_sql(err)}' "
-                    f"WHERE job_id='{_esc_sql(job_id)}'"
-                )
-        except Exception:
-            pass
+            reencode_browser_safe_mp4(input_path, overlay_path)
+            ffmpeg_used = True
+        except Exception as e2:
+            # Final fallback: raw copy (may not play in browser depending on codec)
+            overlay_error = f"{overlay_error} | fallback re-encode failed: {e2}"
+            try:
+                shutil.copyfile(input_path, overlay_path)
+            except Exception as e3:
+                overlay_error = f"{overlay_error} | copy failed: {e3}"
+                overlay_status = "error"
+
+    payload = {
+        "overlay_path": overlay_path if overlay_status == "done" else None,
+        "overlay_status": overlay_status,
+        "overlay_generated": overlay_generated,
+        "ffmpeg_used": ffmpeg_used,
+    }
+    if overlay_error:
+        payload["overlay_error"] = overlay_error
+    set_job_status(job_id, "done", payload)
+    _emit_stage(emit, job_id, "overlay_done" if overlay_status == "done" else "overlay_error")
+
+    if overlay_status == "done":
+        databricks_sync.record_overlay(job_id, overlay_path)
+
+
+def serve() -> None:
+    """
+    Long-lived worker mode used by app.worker_pool.
+    Builds one Pose graph up front, then reads JSON tasks from stdin, one per line:
+      {"kind": "score", "job_id", "input_path"}  -> scores only; the reply carries the overlay task
+      {"kind": "overlay", "job_id", "input_path", "landmarks_path"}
+    While a task runs the worker may write {"event": "stage" | "progress", "job_id", ...} lines;
+    each task is answered with a {"event": "finished", "job_id", ...} line on stdout.
+    Exits when stdin is closed.
+    """
+    # Keep the real stdout for the protocol; anything else printing to fd 1 goes to stderr.
+    proto = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(msg: dict) -> None:
+        proto.write(json.dumps(msg) + "\n")
+        proto.flush()
+
+    with create_pose(CV_MODEL_COMPLEXITY) as pose:
+        send({"event": "ready", "pid": os.getpid()})
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                task = json.loads(line)
+                job_id = task["job_id"]
+            except (ValueError, TypeError, KeyError) as e:
+                # A bad task line must not take the worker (and its warm Pose graph) down
+                send({"event": "finished", "job_id": None, "error": f"malformed task: {e}"})
+                continue
+            overlay_task = None
+            try:
+                if task.get("kind") == "overlay":
+                    render_job_overlay(job_id, task["input_path"], task.get("landmarks_path"), emit=send)
+                else:
+                    overlay_task = process_video(
+                        job_id, task["input_path"], pose=pose, render_overlay=False, emit=send
+                    )
+            except Exception as e:
+                set_job_status(job_id, "error", {"error": str(e)})
+                _emit_stage(send, job_id, "error")
+            send({"event": "finished", "job_id": job_id, "overlay": overlay_task})
 
 
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument("--job_id", required=True)
-    p.add_argument("--input_path", required=True)
+    p.add_argument("--job_id")
+    p.add_argument("--input_path")
+    p.add_argument("--serve", action="store_true", help="run as a persistent pool worker (tasks on stdin)")
     args = p.parse_args()
 
+    if args.serve:
+        serve()
+        return
+
+    if not args.job_id or not args.input_path:
+        p.error("--job_id and --input_path are required unless --serve is given")
     process_video(args.job_id, args.input_path)
 
 
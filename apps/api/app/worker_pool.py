@@ -0,0 +1,315 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .storage import set_job_status
+
+CV_WORKERS = int(os.getenv("CV_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+CV_QUEUE_SIZE = int(os.getenv("CV_QUEUE_SIZE", "32"))
+CV_DRAIN_TIMEOUT_SEC = float(os.getenv("CV_DRAIN_TIMEOUT_SEC", "300"))
+# A task still running after this long (hung in pose / ffmpeg) gets its worker killed and respawned
+# and the job marked as an error; 0 = no limit
+CV_TASK_TIMEOUT_SEC = float(os.getenv("CV_TASK_TIMEOUT_SEC", "1800"))
+# Overlays run only when no scoring job is waiting. They are skipped (scores stay available)
+# when this many scoring jobs are queued (0 = never skip) or the overlay queue is full.
+CV_OVERLAY_SKIP_QUEUE_DEPTH = int(os.getenv("CV_OVERLAY_SKIP_QUEUE_DEPTH", "8"))
+CV_OVERLAY_QUEUE_SIZE = int(os.getenv("CV_OVERLAY_QUEUE_SIZE", "64"))
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_WORKER_PY = os.path.join(_APP_DIR, "worker_local.py")
+
+
+class WorkerPoolFull(Exception):
+    pass
+
+
+def _cv_python() -> str:
+    # Prefer dedicated CV worker venv to avoid protobuf conflicts with chat/cortex
+    cv_python = os.path.abspath(
+        os.path.join(_APP_DIR, "..", ".venv_cv", "Scripts", "python.exe")
+    )
+    return cv_python if os.path.exists(cv_python) else sys.executable
+
+
+def overlay_render_stale(job: Dict[str, Any]) -> bool:
+    """
+    A "rendering" overlay that can't still be running: started longer ago than a task may run
+    (its worker died with the process, or was killed), or recorded before start times were stored.
+    """
+    if job.get("overlay_status") != "rendering":
+        return False
+    started = job.get("overlay_started_at")
+    if started is None:
+        return True
+    return CV_TASK_TIMEOUT_SEC > 0 and time.time() - float(started) > CV_TASK_TIMEOUT_SEC
+
+
+def _skip_overlay(job_id: str, reason: str) -> None:
+    # Scores stay available; the overlay is simply not produced
+    set_job_status(job_id, "done", {"overlay_status": "skipped", "overlay_error": reason})
+
+
+def _pump(stdout, lines: "queue.Queue[Optional[str]]") -> None:
+    try:
+        for line in stdout:
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    lines.put(None)
+
+
+class _Worker:
+    """One persistent `worker_local.py --serve` process with a warm Pose graph."""
+
+    def __init__(self, python_cmd: str):
+        self.python_cmd = python_cmd
+        self.proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def ensure_started(self) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            return
+        self.proc = subprocess.Popen(
+            [self.python_cmd, _WORKER_PY, "--serve"],
+            cwd=_APP_DIR,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        # stdout is drained by a reader thread so run() can wait with a deadline (select() doesn't
+        # work on pipes on Windows); each process gets its own queue, ending with None at EOF
+        self._lines = queue.Queue()
+        threading.Thread(target=_pump, args=(self.proc.stdout, self._lines), name="cv-worker-stdout", daemon=True).start()
+
+    def run(
+        self,
+        task: Dict[str, Any],
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        timeout: float = CV_TASK_TIMEOUT_SEC,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Send one task and block until the worker reports it finished. None if the worker died.
+        Progress/stage lines the worker emits meanwhile are handed to `on_event`.
+        Raises TimeoutError (after killing the worker) when the task runs past `timeout` seconds.
+        """
+        self.ensure_started()
+        deadline = time.monotonic() + timeout if timeout > 0 else None
+        try:
+            self.proc.stdin.write(json.dumps(task) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return None
+        while True:
+            try:
+                line = self._lines.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.kill()
+                raise TimeoutError(f"CV worker timed out after {timeout:g}s")
+            if line is None:
+                return None
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if msg.get("event") == "finished" and msg.get("job_id") == task["job_id"]:
+                return msg
+            if on_event is not None and msg.get("job_id"):
+                on_event(msg)
+
+    def kill(self) -> None:
+        if self.proc is None:
+            return
+        self.proc.kill()
+        try:
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+        self.proc = None
+
+    def stop(self, timeout: float) -> None:
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()  # EOF -> worker exits its read loop
+            self.proc.wait(timeout=timeout)
+        except Exception:
+            self.proc.kill()
+            try:
+                self.proc.wait(timeout=5)  # reap it so no zombie is left behind
+            except Exception:
+                pass
+        self.proc = None
+
+
+class CVWorkerPool:
+    """
+    Fixed number of pre-warmed CV worker processes fed from a bounded queue.
+    submit() raises WorkerPoolFull instead of queueing unbounded work.
+    Scoring jobs always go first; overlay renders (queued when scoring finishes) only run
+    when no scoring job is waiting, and are skipped under load.
+    """
+
+    def __init__(
+        self,
+        workers: int = CV_WORKERS,
+        queue_size: int = CV_QUEUE_SIZE,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.on_event = on_event  # called from pool threads with worker progress/stage events
+        self._tasks: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._overlays: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, CV_OVERLAY_QUEUE_SIZE))
+        self._threads: list[threading.Thread] = []
+        self._workers: list[_Worker] = []
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._accepting = False
+
+    def start(self) -> None:
+        python_cmd = _cv_python()
+        for i in range(self.workers):
+            worker = _Worker(python_cmd)
+            worker.ensure_started()  # pay import + Pose graph cost now, not on the first upload
+            self._workers.append(worker)
+            t = threading.Thread(target=self._run, args=(worker,), name=f"cv-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self._accepting = True
+
+    def is_full(self) -> bool:
+        return self._tasks.full()
+
+    def submit(self, job_id: str, input_path: str) -> None:
+        if not self._accepting:
+            raise WorkerPoolFull("worker pool is not accepting jobs")
+        try:
+            self._tasks.put_nowait({"kind": "score", "job_id": job_id, "input_path": input_path})
+        except queue.Full:
+            raise WorkerPoolFull("worker queue is full")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "busy": self._busy,
+            "queued": self._tasks.qsize(),
+            "queue_size": self._tasks.maxsize,
+            "overlays_queued": self._overlays.qsize(),
+            "accepting": self._accepting,
+        }
+
+    def _emit(self, job_id: str, stage: str, **extra: Any) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event({"event": "stage", "job_id": job_id, "stage": stage, **extra})
+        except Exception:
+            pass
+
+    def _next_task(self) -> Optional[Dict[str, Any]]:
+        """Block for the next task, preferring scoring jobs. None = stop."""
+        while True:
+            try:
+                return self._tasks.get(timeout=0.2)
+            except queue.Empty:
+                pass
+            try:
+                return self._overlays.get_nowait()
+            except queue.Empty:
+                pass
+
+    def _schedule_overlay(self, overlay_task: Dict[str, Any]) -> None:
+        job_id = overlay_task["job_id"]
+        if CV_OVERLAY_SKIP_QUEUE_DEPTH and self._tasks.qsize() >= CV_OVERLAY_SKIP_QUEUE_DEPTH:
+            _skip_overlay(job_id, "skipped under load")
+            self._emit(job_id, "overlay_skipped")
+            return
+        try:
+            self._overlays.put_nowait({"kind": "overlay", **overlay_task})
+        except queue.Full:
+            _skip_overlay(job_id, "overlay queue full")
+            self._emit(job_id, "overlay_skipped")
+
+    def rerender_overlay(self, job: Dict[str, Any]) -> bool:
+        """
+        Queue the overlay again for a finished job whose render was skipped or failed, from its stored
+        video + landmarks. False (nothing queued) when those files are gone or the pool is stopping.
+        """
+        input_path = job.get("filename")
+        landmarks_path = job.get("landmarks_path")
+        if not self._accepting or not input_path or not landmarks_path:
+            return False
+        if not (os.path.exists(input_path) and os.path.exists(landmarks_path)):
+            return False
+        job_id = job["job_id"]
+        set_job_status(job_id, "done", {"overlay_status": "pending", "overlay_error": None})
+        self._emit(job_id, "overlay_pending")
+        self._schedule_overlay({"job_id": job_id, "input_path": input_path, "landmarks_path": landmarks_path})
+        return True
+
+    def _run(self, worker: _Worker) -> None:
+        try:
+            while True:
+                task = self._next_task()
+                if task is None:
+                    break
+                job_id = task["job_id"]
+                with self._lock:
+                    self._busy += 1
+                try:
+                    error = "CV worker exited unexpectedly"
+                    try:
+                        reply = worker.run(task, self.on_event)
+                    except TimeoutError as e:
+                        reply, error = None, str(e)
+                    if reply is None:
+                        if task["kind"] == "overlay":
+                            set_job_status(job_id, "done", {"overlay_status": "error", "overlay_error": error})
+                            self._emit(job_id, "overlay_error")
+                        else:
+                            set_job_status(job_id, "error", {"error": error})
+                            self._emit(job_id, "error")
+                        worker.stop(timeout=5)  # reaped now, restarted on the next task
+                    elif reply.get("overlay"):
+                        self._schedule_overlay(reply["overlay"])
+                finally:
+                    with self._lock:
+                        self._busy -= 1
+        finally:
+            worker.stop(timeout=10)
+
+    def shutdown(self, timeout: float = CV_DRAIN_TIMEOUT_SEC) -> None:
+        """Stop accepting jobs, let queued ones finish (up to `timeout`), then stop the workers."""
+        self._accepting = False
+        deadline = time.monotonic() + timeout
+
+        for _ in self._threads:
+            try:
+                self._tasks.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(timeout=max(0.0, deadline - time.monotonic()))
+        for worker in self._workers:
+            if worker.proc is not None and worker.proc.poll() is None:
+                worker.proc.kill()
+
+        # Anything still queued after the drain deadline will never run
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                set_job_status(task["job_id"], "error", {"error": "server shut down before the job ran"})
+        while True:
+            try:
+                task = self._overlays.get_nowait()
+            except queue.Empty:
+                break
+            _skip_overlay(task["job_id"], "server shut down before rendering")
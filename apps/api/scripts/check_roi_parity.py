@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Make apps/api importable when running this script directly
+API_ROOT = Path(__file__).resolve().parents[1]   # apps/api
+if str(API_ROOT) not in sys.path:
+    sys.path.insert(0, str(API_ROOT))
+
+from app.cv.analyzer import analyze_timeline, extract_landmark_timeline
+from app.cv.config import CV_MODEL_COMPLEXITY, CV_SAMPLE_EVERY_N
+
+# Largest |roi - full| accepted per metric (units of the metric itself)
+TOLERANCES = {
+    "avg_torso_lean_deg": 1.5,
+    "overstride_ratio": 0.05,
+    "knee_drive_ratio": 0.05,
+    "vertical_oscillation_norm": 0.005,
+    "cadence_spm_est": 3.0,
+}
+
+
+def _run(video_path: str, roi: bool):
+    t0 = time.perf_counter()
+    timeline = extract_landmark_timeline(
+        video_path, sample_every_n=CV_SAMPLE_EVERY_N, model_complexity=CV_MODEL_COMPLEXITY, roi=roi
+    )
+    return analyze_timeline(timeline), time.perf_counter() - t0
+
+
+def main():
+    p = argparse.ArgumentParser(description="Check that ROI-cropped inference gives the same metrics as full-frame.")
+    p.add_argument("video_path")
+    args = p.parse_args()
+
+    if not Path(args.video_path).exists():
+        print(f"File not found: {args.video_path}")
+        sys.exit(1)
+
+    full, full_sec = _run(args.video_path, roi=False)
+    roi, roi_sec = _run(args.video_path, roi=True)
+    print(f"full frame: {full_sec:.2f}s  roi: {roi_sec:.2f}s")
+
+    if full.get("ok") != roi.get("ok"):
+        print(json.dumps({"full": full, "roi": roi}, indent=2))
+        print("FAIL: pose detection succeeded in only one of the runs")
+        sys.exit(1)
+
+    failed = []
+    for name, tol in TOLERANCES.items():
+        a = full["raw_metrics"].get(name)
+        b = roi["raw_metrics"].get(name)
+        ok = (a is None and b is None) or (a is not None and b is not None and abs(a - b) <= tol)
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: full={a} roi={b} (tol {tol})")
+        if not ok:
+            failed.append(name)
+
+    if failed:
+        print(f"\nROI metrics drift from full-frame: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nROI and full-frame metrics match")
+
+
+if __name__ == "__main__":
+    main()
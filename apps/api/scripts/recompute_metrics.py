@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# Make apps/api importable when running this script directly
+API_ROOT = Path(__file__).resolve().parents[1]   # apps/api
+if str(API_ROOT) not in sys.path:
+    sys.path.insert(0, str(API_ROOT))
+
+from app.cv.metrics import compute_metrics
+from app.cv.scoring import score_running_form
+from app.cv.timeline import load_timeline
+from app.storage import get_job
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/recompute_metrics.py <job_id | path/to/<job_id>-landmarks.json>")
+        sys.exit(1)
+
+    arg = sys.argv[1]
+    if arg.endswith(".json"):
+        meta_path = arg
+    else:
+        job = get_job(arg)
+        meta_path = (job or {}).get("landmarks_path")
+        if not meta_path:
+            print(f"No stored landmarks for job {arg}")
+            sys.exit(1)
+
+    t0 = time.perf_counter()
+    timeline = load_timeline(meta_path)
+    raw = compute_metrics(timeline)
+    scored = score_running_form(raw["raw_metrics"]) if raw.get("ok") else None
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+
+    print("=== RAW OUTPUT ===")
+    print(json.dumps(raw, indent=2))
+    if scored is not None:
+        print("\n=== SCORED OUTPUT ===")
+        print(json.dumps(scored, indent=2))
+    print(f"\nRecomputed from {timeline.frames_used} sampled frames in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Make apps/api importable when running this script directly
+API_ROOT = Path(__file__).resolve().parents[1]   # apps/api
+if str(API_ROOT) not in sys.path:
+    sys.path.insert(0, str(API_ROOT))
+
+from app.cv.rubrics import get_rubric, list_rubrics
+from app.rescore import rescore_jobs, RESCORE_BATCH_SIZE
+from app.storage import count_job_scores
+
+
+def main():
+    p = argparse.ArgumentParser(description="Re-score stored raw metrics with a rubric version (no CV re-run).")
+    p.add_argument("rubric_version", nargs="?", help="registered rubric version (default: the active one)")
+    p.add_argument("--batch-size", type=int, default=RESCORE_BATCH_SIZE)
+    p.add_argument("--list", action="store_true", help="list rubric versions and stored score counts")
+    args = p.parse_args()
+
+    if args.list:
+        counts = count_job_scores()
+        active = get_rubric().version
+        for version in list_rubrics():
+            marker = " (active)" if version == active else ""
+            print(f"{version}{marker}: {counts.get(version, 0)} scored jobs")
+        return
+
+    try:
+        stats = rescore_jobs(args.rubric_version, args.batch_size)
+    except KeyError as e:
+        print(e.args[0])
+        sys.exit(1)
+
+    print(json.dumps(stats, indent=2))
+    print(f"\nRe-scored {stats['records']} jobs with {stats['rubric_version']} "
+          f"at {stats['records_per_sec']:.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 "use client";
 
 import React from "react";
-import { uploadVideo, fetchResults } from "@/lib/api";
-import type { ScoreResult, MetricScore } from "@/lib/types";
+import { uploadVideo, fetchResults, streamResults } from "@/lib/api";
+import type { ScoreResult, MetricScore, JobProgress } from "@/lib/types";
 
 import ExpandableCard from './ExpandableCard'
 
@@ -14,6 +14,7 @@ export default function UploadCard() {
   const [result, setResult] = React.useState<ScoreResult | null>(null);
   const [loading, setLoading] = React.useState(false);
   const [error, setError] = React.useState<string | null>(null);
+  const [progress, setProgress] = React.useState<JobProgress | null>(null);
   const fileInputRef = React.useRef<HTMLInputElement>(null);
 
   async function pollResultsUntilDone(id: string) {
@@ -22,7 +23,9 @@ export default function UploadCard() {
       const res = await fetchResults(id);
       setResult(res);
 
-      if (res.status === "done" || res.status === "error") {
+      // Scores arrive first; keep polling while the overlay video is still rendering
+      const overlayPending = res.overlay_status === "pending" || res.overlay_status === "rendering";
+      if ((res.status === "done" && !overlayPending) || res.status === "error") {
         return res;
       }
 
@@ -32,12 +35,22 @@ export default function UploadCard() {
     throw new Error("Analysis timed out. Please try again.");
   }
 
+  async function followResults(id: string) {
+    try {
+      return await streamResults(id, setResult, setProgress);
+    } catch {
+      // No server-sent events (proxy, old backend, dropped stream): fall back to polling
+      return pollResultsUntilDone(id);
+    }
+  }
+
   async function onUpload() {
     if (!file) return;
     setLoading(true);
     setError(null);
     setResult(null);
     setJobId(null);
+    setProgress(null);
     try {
       const up = await uploadVideo(file);
       setJobId(up.job_id);
@@ -52,7 +65,7 @@ export default function UploadCard() {
         error: null,
       });
 
-      await pollResultsUntilDone(up.job_id);
+      await followResults(up.job_id);
     } catch (e: any) {
       setError(e?.message ?? "Upload failed");
     } finally {
@@ -205,7 +218,9 @@ export default function UploadCard() {
             {/* Processing State */}
             {(result.status === "queued" || result.status === "processing") && (
               <p className="text-sm text-zinc-400 mb-6">
-                Processing video... this may take a few seconds.
+                {progress && progress.stage === "inference" && progress.frames_total > 0
+                  ? `Analyzing frames... ${Math.min(100, Math.round((100 * progress.frames_done) / progress.frames_total))}%`
+                  : "Processing video... this may take a few seconds."}
               </p>
             )}
 
@@ -297,6 +312,17 @@ export default function UploadCard() {
                 )}
 
                 {/* Video Overlay */}
+                {!videoUrl && (result.overlay_status === "pending" || result.overlay_status === "rendering") && (
+                  <>
+                    <hr className="border-white/10 my-6" />
+                    <p className="text-sm text-zinc-400">
+                      Scores ready, overlay rendering
+                      {progress && progress.stage === "overlay" && progress.frames_total > 0
+                        ? ` (${Math.min(100, Math.round((100 * progress.frames_done) / progress.frames_total))}%)`
+                        : "..."}
+                    </p>
+                  </>
+                )}
                 {videoUrl && (
                   <>
                     <hr className="border-white/10 my-6" />
@@ -1,4 +1,4 @@
-import { UploadResponse, ScoreResult, ChatResponse } from "./types";
+import { UploadResponse, ScoreResult, ChatResponse, JobProgress } from "./types";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
@@ -21,6 +21,44 @@ export async function fetchResults(jobId: string): Promise<ScoreResult> {
   return res.json();
 }
 
+function isTerminal(res: ScoreResult): boolean {
+  if (res.status === "error") return true;
+  return res.status === "done" && res.overlay_status !== "pending" && res.overlay_status !== "rendering";
+}
+
+// Follows a job over server-sent events until it is terminal (error, or done with the overlay settled).
+// Rejects if the stream drops first, so callers can fall back to polling fetchResults.
+export function streamResults(
+  jobId: string,
+  onStatus: (res: ScoreResult) => void,
+  onProgress?: (p: JobProgress) => void
+): Promise<ScoreResult> {
+  return new Promise((resolve, reject) => {
+    if (typeof EventSource === "undefined") {
+      reject(new Error("EventSource not supported"));
+      return;
+    }
+    const es = new EventSource(`${API_URL}/results/${jobId}/events`);
+
+    es.addEventListener("status", (e) => {
+      const res: ScoreResult = JSON.parse((e as MessageEvent).data);
+      onStatus(res);
+      if (isTerminal(res)) {
+        es.close();
+        resolve(res);
+      }
+    });
+    es.addEventListener("progress", (e) => {
+      onProgress?.(JSON.parse((e as MessageEvent).data));
+    });
+    es.onerror = () => {
+      // Server closes the stream after the terminal status; any other drop is an error
+      es.close();
+      reject(new Error("Results stream closed"));
+    };
+  });
+}
+
 export async function sendChat(message: string, runContext?: Record<string, any>): Promise<ChatResponse> {
   const res = await fetch(`${API_URL}/chat`, {
     method: "POST",
@@ -1,5 +1,6 @@
 export type UploadResponse = {
   job_id: string;
+  cached?: boolean;
 };
 
 export type MetricScore = {
@@ -18,9 +19,19 @@ export type ScoreResult = {
   metrics: MetricScore[];
   tips: string[];
   overlay_path?: string | null;
+  overlay_status?: "pending" | "rendering" | "done" | "skipped" | "error" | null;
   error?: string | null;
 };
 
+// Pushed on /results/{job_id}/events while a job runs
+export type JobProgress = {
+  job_id: string;
+  stage: string;
+  frames_done: number;
+  frames_total: number;
+  metrics?: Record<string, number | null>;
+};
+
 export type ChatResponse = {
   message: string;
   citations: { title: string; note: string }[];